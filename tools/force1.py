@@ -15,7 +15,6 @@ The force:
   • is exactly zero for d ≥ 3·Σr
 """
 
-import math
 import numpy as np
 import matplotlib.pyplot as plt
 from typing import Tuple
@@ -36,7 +35,7 @@ def sphere_force_smooth(
     dx = pos2[0] - pos1[0]
     dy = pos2[1] - pos1[1]
     dz = pos2[2] - pos1[2]
-    d = math.sqrt(dx*dx + dy*dy + dz*dz)
+    d = (dx*dx + dy*dy + dz*dz) ** 0.5
 
     r_sum = radius1 + radius2
     d_min = 1.5 * r_sum          # singular distance
@@ -69,7 +68,7 @@ def sphere_force_smooth(
 # ----------------------------------------------------------------------
 def force_magnitude(vec: Tuple[float, float, float]) -> float:
     """Scalar magnitude of a 3‑D vector."""
-    return math.sqrt(vec[0]**2 + vec[1]**2 + vec[2]**2)
+    return (vec[0]*vec[0] + vec[1]*vec[1] + vec[2]*vec[2]) ** 0.5
 
 
 # ----------------------------------------------------------------------
@@ -78,7 +77,7 @@ def main():
     radius1 = 1.0               # radius of sphere 1 (any length unit)
     radius2 = 1.0               # radius of sphere 2
     fc1     = 10.0              # global force constant (tunable)
-    pos1    = (0.0, 0.0, 0.0)   # keep sphere 1 at the origin
+    singularity_cap = 1e12      # magnitude at/inside the singular distance
 
     r_sum = radius1 + radius2
 
@@ -87,13 +86,14 @@ def main():
     d_end   = 4.0 * r_sum
     distances = np.linspace(d_start * 1.001, d_end, 600)   # avoid exact singularity
 
-    forces = []          # force magnitude for each sampled distance
-    for d in distances:
-        pos2 = (d, 0.0, 0.0)                # place sphere 2 on the x‑axis
-        vec  = sphere_force_smooth(pos1, radius1, pos2, radius2, fc1)
-        forces.append(force_magnitude(vec))
-
-    forces = np.array(forces)
+    # Sphere 2 sits on the x‑axis, so the force magnitude is the scalar
+    # `mag` from sphere_force_smooth; evaluate it for all distances at once.
+    d_min = 1.5 * r_sum          # singular distance
+    d_max = 3.0 * r_sum          # outer cutoff
+    with np.errstate(divide="ignore"):
+        forces = np.where(distances <= d_min, singularity_cap,
+                          fc1 / (distances - d_min) * (d_max - distances) / (d_max - d_min))
+    forces = np.where(distances >= d_max, 0.0, forces)
     forcesX10 = np.clip(np.array(forces * 10),a_min=None, a_max=forces.max())
     
 
@@ -1,8 +1,8 @@
 import numpy as np
+from numba import njit, prange
 from dataclasses import dataclass, field
 import plotly.graph_objects as go
 import json 
-import random 
 # ----------------------------
 # Model configuration
 # ----------------------------
@@ -63,13 +63,6 @@ class Body:
     d: float
     attractors: list = field(default_factory=list)
 
-def to_vec(x, z):
-    """Return a 3D vector on the x/z plane (y=0)."""
-    return np.array([x, 0.0, z], dtype=float)
-
-def norm(v):
-    return np.linalg.norm(v) + 0.0
-
 # Build bodies with per-object attractors mapped to x/z
 bodies = []
 for i in range(N):
@@ -81,83 +74,160 @@ for i in range(N):
         #body.b = 10.1
     bodies.append(body)
 
+# Flatten the ragged per-body attractor lists into arrays (one row per attractor).
+# The Body list above is only kept for reporting and the JSON dump.
+# The dicts are read once into a typed record array.
+att_arr   = np.array([(a["x"], a["z"], a["w"]) for b in bodies for a in b.attractors],
+                     dtype=[("x", "f8"), ("z", "f8"), ("w", "f8")])
+att_x     = np.ascontiguousarray(att_arr["x"])
+att_z     = np.ascontiguousarray(att_arr["z"])
+att_k     = GLOBAL_ATTRACTOR_K * att_arr["w"]
+att_owner = np.repeat(np.arange(N), [len(b.attractors) for b in bodies])
+
+# The attractor pulls are linear in the position, so per body they collapse to
+#   sum_a k_a * (att_a - p) = sum_a k_a * att_a - (sum_a k_a) * p
+# i.e. a constant bias minus a scaled position; the kernel never loops attractors.
+att_ksum  = np.bincount(att_owner, att_k, minlength=N)
+att_bx    = np.bincount(att_owner, att_k * att_x, minlength=N)
+att_bz    = np.bincount(att_owner, att_k * att_z, minlength=N)
+
+# Coefficients that stay constant during the simulation, hoisted out of the kernel
+grav_coef     = GLOBAL_GRAVITY_K * (10 + prop_a)
+buoy_const    = GLOBAL_BUOYANCY_K * (10 + prop_b)
+pair_cut      = .7 * (diam[:, None] + diam[None, :])
+pair_strength = GLOBAL_CLUSTER_K * (clusters[:, None] + clusters[None, :]) * (clusters[:, None] == clusters[None, :])
+
 # ----------------------------
 # Force computation
 # ----------------------------
 
-def compute_forces(positions):
+# Explicit signatures compile both functions eagerly for contiguous float64
+# arrays, so LLVM sees unit-stride rows and no dispatch happens at call time.
+_ARRAYS_SIG = ("f8[:, ::1], f8[::1], f8[::1], f8[:, ::1], f8[:, ::1], "
+               "f8[::1], f8[::1], f8[::1], f8[:, ::1]")
+
+
+@njit("void(" + _ARRAYS_SIG + ")", parallel=True, fastmath=True, cache=True)
+def compute_forces(pos, grav_coef, buoy_const, pair_cut, pair_strength, att_bx, att_bz, att_ksum, F):
     """
-    Returns array of shape (N, 3) with total force on each body,
+    Fills F (shape (N, 3)) with the total force on each body,
     using the rules specified in the prompt.
+
+    The attractors of body i enter in closed form: att_ksum[i] is the sum of
+    their weights (already scaled by GLOBAL_ATTRACTOR_K) and att_bx[i] /
+    att_bz[i] the weighted sums of their x / z coordinates.
+    pair_strength is zero for pairs in different clusters.
     """
-    F = np.zeros_like(positions)
-
-    # --- 1) Attractor forces (x/z plane only) ---
-    # f_vec = w * GLOBAL_ATTRACTOR_K * (attractor_position - object_position)_xz
-    for b in bodies:
-        p = positions[b.i]
-        for att in b.attractors:
-            att_pos = to_vec(att["x"], att["z"])
-            delta_xz = (att_pos - p) * np.array([1, 0, 1], dtype=float)  # zero out y
-            F[b.i] += att["w"] * GLOBAL_ATTRACTOR_K * delta_xz
-
-    # --- 2) Intra-cluster pairwise attraction on x/z ---
-    # f_vec = GLOBAL_CLUSTER_K * (c_i + c_j) * (p_j - p_i)_xz
-    for i in range(N):
-        for j in range(i+1, N):
-            if bodies[i].c == bodies[j].c:
-                delta = positions[j] - positions[i]
-                delta_xz = delta * np.array([1, 0, 1], dtype=float)
-                strength = GLOBAL_CLUSTER_K * (bodies[i].c + bodies[j].c)
-                F[i] +=  strength * delta_xz
-                F[j] += -strength * delta_xz  # equal & opposite
-
-    # --- 3) Pairwise repulsion in full 3D ---
-    # f_mag = GLOBAL_REPULSIVE_K / (dist - 1.5 * (d_i + d_j)); direction = away from the other body
-    for i in range(N):
-        for j in range(i+1, N):
-            rij = positions[i] - positions[j]
-            dist = norm(rij)
-            # Avoid divide by zero; also handle very small denominator to keep things finite
-            denom = max(EPS, dist - .7 * (bodies[i].d + bodies[j].d))
-            mag = GLOBAL_REPULSIVE_K / denom
-            # Direction for i is away from j
-            dir_ij = rij / max(dist, EPS)
-            f_vec = mag * dir_ij
-            F[i] += f_vec
-            F[j] -= f_vec  # equal & opposite
-
-    # --- 4) Gravity-like toward y=0 (negative y only) ---
-    # f_y = -GLOBAL_GRAVITY_K * a_i
-    for b in bodies:
-        F[b.i][1] += -GLOBAL_GRAVITY_K * (10 + b.a) * positions[b.i][1] if positions[b.i][1] >= 0 else 10000.0
-
-    # --- 5) Buoyancy-like opposite (positive y only) ---
-    # f_y += +GLOBAL_GRAVITY_K * b_i
-    for b in bodies:
-        F[b.i][1] += +GLOBAL_BUOYANCY_K * (10 + b.b) if positions[b.i][1] >= 0 else 10000.0
-
-    return F
+    n = pos.shape[0]
+
+    # Per-body terms, independent across bodies
+    for i in prange(n):
+        px = pos[i, 0]
+        py = pos[i, 1]
+        pz = pos[i, 2]
+        fx = 0.0
+        fy = 0.0
+        fz = 0.0
+
+        # --- 1) Attractor forces (x/z plane only) ---
+        # f_vec = sum_a w_a * GLOBAL_ATTRACTOR_K * (attractor_position - object_position)_xz
+        fx += att_bx[i] - att_ksum[i] * px
+        fz += att_bz[i] - att_ksum[i] * pz
+
+        # --- 4) Gravity-like toward y=0 (negative y only) ---
+        # f_y = -GLOBAL_GRAVITY_K * a_i
+        # --- 5) Buoyancy-like opposite (positive y only) ---
+        # f_y += +GLOBAL_GRAVITY_K * b_i
+        # Both only act above ground; below it each contributes a fixed 10000 push-up.
+        if py >= 0:
+            fy += -grav_coef[i] * py + buoy_const[i]
+        else:
+            fy += 10000.0 + 10000.0
+
+        F[i, 0] = fx
+        F[i, 1] = fy
+        F[i, 2] = fz
+
+    # Pair terms, visiting each pair once and applying equal & opposite forces.
+    # Kept serial: every pair writes to both F[i] and F[j].
+    for i in range(n):
+        px = pos[i, 0]
+        py = pos[i, 1]
+        pz = pos[i, 2]
+        fx = 0.0
+        fy = 0.0
+        fz = 0.0
+        for j in range(i + 1, n):
+            dx = pos[j, 0] - px
+            dy = pos[j, 1] - py
+            dz = pos[j, 2] - pz
+            gx = 0.0
+            gy = 0.0
+            gz = 0.0
+
+            # --- 2) Intra-cluster pairwise attraction on x/z ---
+            # f_vec = GLOBAL_CLUSTER_K * (c_i + c_j) * (p_j - p_i)_xz
+            gx += pair_strength[i, j] * dx
+            gz += pair_strength[i, j] * dz
+
+            # --- 3) Pairwise repulsion in full 3D ---
+            # f_mag = GLOBAL_REPULSIVE_K / (dist - 0.7 * (d_i + d_j)); direction = away from j
+            dist = np.sqrt(dx * dx + dy * dy + dz * dz)
+            # magnitude and 1/dist share a single division
+            s = GLOBAL_REPULSIVE_K / (max(EPS, dist - pair_cut[i, j]) * max(dist, EPS))
+            gx -= s * dx
+            gy -= s * dy
+            gz -= s * dz
+
+            fx += gx
+            fy += gy
+            fz += gz
+            F[j, 0] -= gx  # equal & opposite
+            F[j, 1] -= gy
+            F[j, 2] -= gz
+        F[i, 0] += fx
+        F[i, 1] += fy
+        F[i, 2] += fz
 
 # ----------------------------
 # Simulation loop (damped Euler)
 # ----------------------------
 
-converged = False
-for step in range(1, MAX_STEPS + 1):
-    forces = compute_forces(pos)
-    max_force = np.max(np.linalg.norm(forces, axis=1))
-
-    # print(f"Step {step:4d}  |  max residual force: {max_force:.6f}")
-    # Stop if residual forces are small
-    if max_force < FORCE_THRESHOLD:
-        converged = True
-        print(f"Step {step:4d}  |  max residual force: {max_force:.6f}")
-        break
-
-    # Integrate (unit mass)
-    vel = DAMPING * vel + DT * forces
-    pos = pos + DT * vel
+@njit("Tuple((i8, f8, b1))(f8[:, ::1], " + _ARRAYS_SIG + ")", fastmath=True, cache=True)
+def simulate(pos, vel, grav_coef, buoy_const, pair_cut, pair_strength, att_bx, att_bz, att_ksum, F):
+    """
+    Runs the damped Euler loop (unit mass) until the largest residual force
+    drops below FORCE_THRESHOLD or MAX_STEPS is reached. pos and vel are
+    updated in place; returns (step, max_force, converged).
+    """
+    n = pos.shape[0]
+    thresh2 = FORCE_THRESHOLD * FORCE_THRESHOLD
+    max_f2 = 0.0
+    for step in range(1, MAX_STEPS + 1):
+        compute_forces(pos, grav_coef, buoy_const, pair_cut, pair_strength, att_bx, att_bz, att_ksum, F)
+
+        # Stop if residual forces are small (compare squared magnitudes, no sqrt per body)
+        max_f2 = 0.0
+        for i in range(n):
+            f2 = F[i, 0] * F[i, 0] + F[i, 1] * F[i, 1] + F[i, 2] * F[i, 2]
+            if f2 > max_f2:
+                max_f2 = f2
+        if max_f2 < thresh2:
+            return step, np.sqrt(max_f2), True
+
+        # Integrate (unit mass)
+        for i in range(n):
+            for k in range(3):
+                vel[i, k] = DAMPING * vel[i, k] + DT * F[i, k]
+                pos[i, k] += DT * vel[i, k]
+
+    return MAX_STEPS, np.sqrt(max_f2), False
+
+forces = np.empty_like(pos)
+step, max_force, converged = simulate(pos, vel, grav_coef, buoy_const, pair_cut, pair_strength,
+                                      att_bx, att_bz, att_ksum, forces)
+if converged:
+    print(f"Step {step:4d}  |  max residual force: {max_force:.6f}")
 
 # ----------------------------
 # Results
@@ -180,6 +250,13 @@ for i in range(N):
     print(f"  Obj {i+1}: {A}")
 
 
+# Cosmetic rotation/orbit parameters, drawn in one batch per field
+rng = np.random.default_rng()
+rot_speed  = rng.uniform(0, .1, N)
+rot_angle  = rng.uniform(0, 6.2, N)
+orb_radius = rng.integers(3, 20, N, endpoint=True)
+orb_speed  = rng.uniform(0, .01, N)
+
 objects_json = []
 
 for i, b in enumerate(bodies):
@@ -197,13 +274,13 @@ for i, b in enumerate(bodies):
         "parm_b": float(b.b),
         "parm_c": float(b.c),
         "rotation": {
-            "speed": random.uniform(0, .1),
-            "angle": random.uniform(0,6.2),
+            "speed": float(rot_speed[i]),
+            "angle": float(rot_angle[i]),
             "active": True
         },
         "orbit": {
-            "radius": random.randint(3,20),
-            "speed": random.uniform(0, .01),
+            "radius": int(orb_radius[i]),
+            "speed": float(orb_speed[i]),
             "angle": .1,
             "active": True
         }
@@ -243,17 +320,15 @@ fig.add_trace(go.Scatter3d(
     name="Objects"
 ))
 
-# Attractors as red Xs on the ground (y=0 in sim → z=0 in plot)
-for i, b in enumerate(bodies):
-    for att in b.attractors:
-        fig.add_trace(go.Scatter3d(
-            x=[att["x"]],
-            y=[att["z"]],
-            z=[0],
-            mode='markers',
-            marker=dict(size=6, color='red', symbol='x'),
-            name=f"Attractor Obj {i+1}"
-        ))
+# Attractors as red Xs on the ground (y=0 in sim → z=0 in plot), one trace for all
+fig.add_trace(go.Scatter3d(
+    x=att_x,
+    y=att_z,
+    z=np.zeros_like(att_x),
+    mode='markers',
+    marker=dict(size=6, color='red', symbol='x'),
+    name="Attractors"
+))
 
 # Add a transparent ground plane for reference
 plane_size = 15
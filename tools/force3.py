@@ -1,12 +1,9 @@
 import sys
 import numpy as np
-from dataclasses import dataclass, field
+from numba import njit, prange, get_thread_id, config
 import plotly.graph_objects as go
 import json 
-import random 
-import pandas as pd
 import signal
-import concurrent.futures
 import matplotlib.pyplot as plt
 
 # ----------------------------
@@ -34,154 +31,180 @@ EPS                   = 1e-6     # small epsilon for numerical safety
 # Helpers
 # ----------------------------
 
-@dataclass
-class Body:
-    i: int
-    a: float
-    b: float
-    c: float
-    d: float
-    pos: np.ndarray = field(default_factory=lambda: np.zeros(3))
-    vel: np.ndarray = field(default_factory=lambda: np.zeros(3))
-    attractors: list = field(default_factory=list)
-
-def to_vec(x, z):
-    """Return a 3D vector on the x/z plane (y=0)."""
-    return np.array([x, 0.0, z], dtype=float)
-
-def norm(v):
-    return np.linalg.norm(v) + 0.0
-
-df = pd.read_json("mcMatch_full.json")
-
-bodies = []
-# iterate over df and create Body instances
-for i, row in df[:100].iterrows():
-    att = row["attractors"] 
-    body = Body(i=i, a=row["a"], b=row["b"], c=row["c"], d=row["d"], 
-        attractors=att, pos=np.array([att[0]["x"], att[0]["z"], row["b"]], dtype=float), 
-        vel=np.array([0.0, 0.0, 0.1], dtype=float))
-    bodies.append(body)
-    
-# Initial positions (random)
-N = len(bodies)
-
-#clusters = df.c.to_list()
-diam     = df.d.to_list()
-
-# clusters are groups of objects with same c value
-clusters = {}
-for i, c in enumerate(clusters):
-    if c not in clusters:
-        clusters[c] = []
-    clusters[c].append(bodies[i])
+# Only the first 100 records are simulated; plain json avoids building a DataFrame
+with open("mcMatch_full.json", "r", encoding="utf-8") as f:
+    records = json.load(f)[:100]
+
+N = len(records)
+
+# Simulation state as structure-of-arrays, one entry per body.
+# Stored as float32, like forceParallel: the damped relaxation and the
+# coarse FORCE_THRESHOLD do not need double precision.
+# Initial position from first attractor + b value.
+pos = np.array([[r["attractors"][0]["x"], r["attractors"][0]["z"], r["b"]] for r in records], dtype=np.float32)
+vel = np.tile(np.array([0.0, 0.0, 0.1], dtype=np.float32), (N, 1))
+a_arr = np.array([r["a"] for r in records], dtype=np.float32)
+b_arr = np.array([r["b"] for r in records], dtype=np.float32)
+c_arr = np.array([r["c"] for r in records], dtype=np.float32)
+d_arr = np.array([r["d"] for r in records], dtype=np.float32)
+
+# Flatten the ragged per-body attractor lists into arrays (one row per attractor).
+# The dicts are read once into a typed record array; the hot path uses contiguous columns.
+att_arr   = np.array([(a["x"], a["z"], a["w"]) for r in records for a in r["attractors"]],
+                     dtype=[("x", "f4"), ("z", "f4"), ("w", "f4")])
+att_x     = np.ascontiguousarray(att_arr["x"])
+att_z     = np.ascontiguousarray(att_arr["z"])
+att_k     = GLOBAL_ATTRACTOR_K * att_arr["w"]
+att_owner = np.array([i for i, r in enumerate(records) for _ in r["attractors"]], dtype=int)
+
+# The attractor pulls are linear in the position, so per body they collapse to
+#   sum_a k_a * (att_a - p) = sum_a k_a * att_a - (sum_a k_a) * p
+# i.e. a constant bias minus a scaled position; the kernel never loops attractors.
+att_ksum  = np.bincount(att_owner, att_k, minlength=N).astype(np.float32)
+att_bx    = np.bincount(att_owner, att_k * att_x, minlength=N).astype(np.float32)
+att_bz    = np.bincount(att_owner, att_k * att_z, minlength=N).astype(np.float32)
+
+# Coefficients that stay constant during the simulation, hoisted out of compute_forces
+grav_coef     = GLOBAL_GRAVITY_K * (10 + a_arr)
+buoy_const    = GLOBAL_BUOYANCY_K * (10 + b_arr)
+pair_cut      = 0.7 * (d_arr[:, None] + d_arr[None, :])
+# Cluster attraction only acts between bodies with the same c, so within a
+# cluster every pair has strength GLOBAL_CLUSTER_K * 2c and the pull on i is
+#   2Kc * sum_{j in cluster} (p_j - p_i) = 2Kc * (cluster_sum - size * p_i)
+# The kernel forms the per-cluster position sums once per call, O(N) overall.
+_, cl_id, cl_count = np.unique(c_arr, return_inverse=True, return_counts=True)
+cl_id       = cl_id.astype(np.int64)
+cl_size     = cl_count[cl_id].astype(np.float32)
+cl_coef     = (2 * GLOBAL_CLUSTER_K * c_arr).astype(np.float32)
+# per-thread per-cluster x / z sums, so the parallel accumulation needs no atomics
+cl_sum      = np.zeros((config.NUMBA_NUM_THREADS, len(cl_count), 2), dtype=np.float32)
+
+# cluster id per body, used to colour the plot
+clusters = c_arr
 
 # ----------------------------
 # Force computation
 # ----------------------------
 
-def compute_forces():
+@njit(parallel=True, fastmath=True, cache=True)
+def compute_forces(pos, grav_coef, buoy_const, pair_cut, cl_id, cl_size, cl_coef, cl_sum,
+                   att_bx, att_bz, att_ksum, scratch, F):
     """
-    Returns array of shape (N, 3) with total force on each body,
-    using the rules specified in the prompt.
+    Fills F (shape (N, 3)) with the total force on each body,
+    using the rules specified in the prompt. F is reused across steps.
+
+    The attractors of body i enter in closed form: att_ksum[i] is the sum of
+    their weights (already scaled by GLOBAL_ATTRACTOR_K) and att_bx[i] /
+    att_bz[i] the weighted sums of their x / z coordinates.
+    Cluster attraction goes through the per-cluster position sums: each thread
+    adds its bodies' x / z into its own slice of cl_sum (shape (T, G, 2),
+    overwritten) and body i in cluster cl_id[i] of cl_size[i] members is
+    pulled by cl_coef[i] * (sum over slices - cl_size[i] * p_i).
+    Repulsion is evaluated once per pair (i < j) and applied equal & opposite
+    into the calling thread's slice of scratch (shape (T, N, 3)); the slices
+    are summed in the per-body pass.
     """
-
-    F = np.zeros_like([b.pos for b in bodies], dtype=float)  # shape (N, 3)
-
-    # --- 1) Attractor forces (x/z plane only) ---
-    # f_vec = w * GLOBAL_ATTRACTOR_K * (attractor_position - object_position)_xz
-
-    def _body_attractor_force(b):
-        p = b.pos
-        total = np.zeros(3, dtype=float)
-        for att in b.attractors:
-            att_pos = to_vec(att["x"], att["z"])
-            delta_xz = (att_pos - p) * np.array([1, 0, 1], dtype=float)
-            total += att["w"] * GLOBAL_ATTRACTOR_K * delta_xz
-        return b.i, total
-
-    # Parallelize per-body attractor accumulation using threads (numpy releases GIL on heavy ops)
-    max_workers = min(32, max(1, len(bodies)))
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as ex:
-        for idx, vec in ex.map(_body_attractor_force, bodies):
-            F[idx] += vec
-
-    # --- 2) Intra-cluster pairwise attraction on x/z ---
-    # f_vec = GLOBAL_CLUSTER_K * (c_i + c_j) * (p_j - p_i)_xz
-    # check all pairs in same cluster
-    def _cluster_forces(cluster):
-        """Compute pairwise intra-cluster x/z attraction forces for one cluster."""
-        res = []
-        L = len(cluster)
-        for i in range(L):
-            for j in range(i + 1, L):
-                bi = cluster[i]
-                bj = cluster[j]
-                delta = bj.pos - bi.pos
-                delta_xz = delta * np.array([1, 0, 1], dtype=float)
-                strength = GLOBAL_CLUSTER_K * (bi.c + bj.c)
-                f = strength * delta_xz
-                res.append((bi.i, f))
-                res.append((bj.i, -f))
-        return res
-
-    max_workers = min(32, max(1, len(bodies)))
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as ex:
-        # map over clusters in parallel, then accumulate results in the main thread
-        for pair_list in ex.map(_cluster_forces, list(clusters.values())):
-            for idx, vec in pair_list:
-                F[idx] += vec
-                
-    # --- 3) Pairwise repulsion in full 3D ---
-    # Parallelized pairwise repulsion in full 3D (compute per-body against all others)
-    # f_mag = GLOBAL_REPULSIVE_K / (dist - 0.7 * (d_i + d_j)); direction = away from the other body
-    def _repulse_body(b):
-        total = np.zeros(3, dtype=float)
-        for bj in bodies:
-            if bj.i == b.i:
-                continue
-            rij = b.pos - bj.pos
-            dist = norm(rij)
-            denom = max(EPS, dist - 0.7 * (b.d + bj.d))
-            mag = GLOBAL_REPULSIVE_K / denom
-            dir_ij = rij / max(dist, EPS)
-            total += mag * dir_ij
-        return b.i, total
-
-    max_workers = min(32, max(1, len(bodies)))
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as ex:
-        for idx, vec in ex.map(_repulse_body, bodies):
-            F[idx] += vec
-            
-    # --- 4) Gravity-like toward y=0 (negative y only) ---
-    # f_y = -GLOBAL_GRAVITY_K * a_i
-    def _gravity_body(b):
-        val = -GLOBAL_GRAVITY_K * (10 + b.a) * b.pos[1] if b.pos[1] >= 0 else 10000.0
-        return b.i, np.array([0.0, val, 0.0], dtype=float)
-
-    max_workers = min(32, max(1, len(bodies)))
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as ex:
-        for idx, vec in ex.map(_gravity_body, bodies):
-            F[idx] += vec
-
-    # --- 5) Buoyancy-like opposite (positive y only) ---
-    # f_y += +GLOBAL_GRAVITY_K * b_i
-    def _buoyancy_body(b):
-        val = GLOBAL_BUOYANCY_K * (10 + b.b) if b.pos[1] >= 0 else 10000.0
-        return b.i, np.array([0.0, val, 0.0], dtype=float)
-
-    max_workers = min(32, max(1, len(bodies)))
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as ex:
-        for idx, vec in ex.map(_buoyancy_body, bodies):
-            F[idx] += vec
-
-    return F
+    n = pos.shape[0]
+
+    cl_sum[:] = 0.0
+    scratch[:] = 0.0
+    for i in prange(n):
+        tid = get_thread_id()
+        px = pos[i, 0]
+        py = pos[i, 1]
+        pz = pos[i, 2]
+        cl_sum[tid, cl_id[i], 0] += px
+        cl_sum[tid, cl_id[i], 1] += pz
+        fx = 0.0
+        fy = 0.0
+        fz = 0.0
+        for j in range(i + 1, n):
+            dx = pos[j, 0] - px
+            dy = pos[j, 1] - py
+            dz = pos[j, 2] - pz
+
+            # --- 3) Pairwise repulsion in full 3D ---
+            # f_mag = GLOBAL_REPULSIVE_K / (dist - 0.7 * (d_i + d_j)); direction = away from j
+            dist = np.sqrt(dx * dx + dy * dy + dz * dz)
+            # magnitude and 1/dist share a single division
+            s = GLOBAL_REPULSIVE_K / (max(EPS, dist - pair_cut[i, j]) * max(dist, EPS))
+            gx = -s * dx
+            gy = -s * dy
+            gz = -s * dz
+
+            fx += gx
+            fy += gy
+            fz += gz
+            scratch[tid, j, 0] -= gx  # equal & opposite
+            scratch[tid, j, 1] -= gy
+            scratch[tid, j, 2] -= gz
+        scratch[tid, i, 0] += fx
+        scratch[tid, i, 1] += fy
+        scratch[tid, i, 2] += fz
+
+    for i in prange(n):
+        px = pos[i, 0]
+        py = pos[i, 1]
+        pz = pos[i, 2]
+        fx = 0.0
+        fy = 0.0
+        fz = 0.0
+        for t in range(scratch.shape[0]):
+            fx += scratch[t, i, 0]
+            fy += scratch[t, i, 1]
+            fz += scratch[t, i, 2]
+
+        # --- 1) Attractor forces (x/z plane only) ---
+        # f_vec = sum_a w_a * GLOBAL_ATTRACTOR_K * (attractor_position - object_position)_xz
+        fx += att_bx[i] - att_ksum[i] * px
+        fz += att_bz[i] - att_ksum[i] * pz
+
+        # --- 2) Intra-cluster pairwise attraction on x/z ---
+        # f_vec = GLOBAL_CLUSTER_K * (c_i + c_j) * (p_j - p_i)_xz, summed over the cluster
+        g = cl_id[i]
+        sx = 0.0
+        sz = 0.0
+        for t in range(cl_sum.shape[0]):
+            sx += cl_sum[t, g, 0]
+            sz += cl_sum[t, g, 1]
+        fx += cl_coef[i] * (sx - cl_size[i] * px)
+        fz += cl_coef[i] * (sz - cl_size[i] * pz)
+
+        # --- 4) Gravity-like toward y=0 (negative y only) ---
+        # f_y = -GLOBAL_GRAVITY_K * a_i
+        # --- 5) Buoyancy-like opposite (positive y only) ---
+        # f_y += +GLOBAL_GRAVITY_K * b_i
+        # Both only act above ground; below it each contributes a fixed 10000 push-up.
+        if py >= 0:
+            fy += -grav_coef[i] * py + buoy_const[i]
+        else:
+            fy += 10000.0 + 10000.0
+
+        F[i, 0] = fx
+        F[i, 1] = fy
+        F[i, 2] = fz
+
+@njit(fastmath=True, cache=True)
+def residuals(F):
+    """
+    Returns (max, sum) of the per-body force magnitudes |F[i]| in a single
+    pass over F, without a temporary norm array.
+    """
+    maxf = 0.0
+    sumf = 0.0
+    for i in range(F.shape[0]):
+        f = np.sqrt(F[i, 0] * F[i, 0] + F[i, 1] * F[i, 1] + F[i, 2] * F[i, 2])
+        maxf = max(maxf, f)
+        sumf += f
+    return maxf, sumf
 
 # ----------------------------
 # Simulation loop (damped Euler)
 # ----------------------------
 
 tf = []  # track time forces for debugging
+forces = np.zeros((N, 3), dtype=np.float32)  # force buffer, reused every step
+scratch = np.zeros((config.NUMBA_NUM_THREADS, N, 3), dtype=np.float32)  # per-thread pair-force accumulators
 converged = False
 # install a SIGINT handler that sets a flag so we can exit cleanly
 _stop_flag = {"stop": False}
@@ -209,13 +232,14 @@ try:
                 break   
 
         try:
-            forces = compute_forces()
+            compute_forces(pos, grav_coef, buoy_const, pair_cut, cl_id, cl_size, cl_coef, cl_sum,
+                           att_bx, att_bz, att_ksum, scratch, forces)
         except KeyboardInterrupt:
             _stop_flag["stop"] = True
             print("\nKeyboardInterrupt during force computation — exiting loop.")
             break
 
-        max_force = np.max(np.linalg.norm(forces, axis=1))
+        max_force, _ = residuals(forces)
         tf.append(max_force)
         if step % 10 == 0:
             print(f"Step {step:4d}..., max residual force: {max_force:.6f}", end="\r")
@@ -226,22 +250,10 @@ try:
             print(f"Step {step:4d}  |  max residual force: {max_force:.6f}")
             break
 
-        # Integrate (unit mass) - parallelized per body
-        def _integrate_body(b):
-            new_vel = DAMPING * b.vel + DT * forces[b.i]
-            new_pos = b.pos + DT * new_vel
-            return b.i, new_vel, new_pos
-
-        max_workers = min(32, max(1, len(bodies)))
-        try:
-            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as ex:
-                for idx, new_vel, new_pos in ex.map(_integrate_body, bodies):
-                    bodies[idx].vel = new_vel
-                    bodies[idx].pos = new_pos
-        except KeyboardInterrupt:
-            _stop_flag["stop"] = True
-            print("\nKeyboardInterrupt during integration — exiting loop.")
-            break
+        # Integrate (unit mass), updating the state arrays in place
+        vel *= DAMPING
+        vel += DT * forces
+        pos += DT * vel
 finally:
     # restore original SIGINT handler
     signal.signal(signal.SIGINT, _orig_sigint)
@@ -254,33 +266,41 @@ np.set_printoptions(precision=4, suppress=True)
 
 #print("Final positions (x, y, z):")
 #for i in range(N):
-#    print(f"  Obj {i+1}: {bodies[i].pos}")
+#    print(f"  Obj {i+1}: {pos[i]}")
+
 
+# Cosmetic rotation/orbit parameters, drawn in one batch per field
+rng = np.random.default_rng()
+rot_speed  = rng.uniform(0, .1, N)
+rot_angle  = rng.uniform(0, 6.2, N)
+orb_radius = rng.integers(3, 20, N, endpoint=True)
+orb_speed  = rng.uniform(0, .01, N)
 
 objects_json = []
 
-for i, b in enumerate(bodies):
+for i in range(N):
     obj_entry = {
         "mesh": None,
         "name": f"obj{i+1}",
         "emissive": False,
         "map": None,
         "img": "img/textures/poster.png",
-        "xpos": float(b.pos[0]),
-        "ypos": float(b.pos[1]),
-        "zpos": float(b.pos[2]),
-        "parm_a": float(b.a),
-        "parm_b": float(b.b),
-        "parm_c": float(b.c),
-        "diameter": float(b.d),
+        "xpos": float(pos[i, 0]),
+        "ypos": float(pos[i, 1]),
+        "zpos": float(pos[i, 2]),
+        # metadata straight from the input records, not the float32 state
+        "parm_a": float(records[i]["a"]),
+        "parm_b": float(records[i]["b"]),
+        "parm_c": float(records[i]["c"]),
+        "diameter": float(records[i]["d"]),
         "rotation": {
-            "speed": random.uniform(0, .1),
-            "angle": random.uniform(0,6.2),
+            "speed": float(rot_speed[i]),
+            "angle": float(rot_angle[i]),
             "active": True
         },
         "orbit": {
-            "radius": random.randint(3,20),
-            "speed": random.uniform(0, .01),
+            "radius": int(orb_radius[i]),
+            "speed": float(orb_speed[i]),
             "angle": .1,
             "active": True
         }
@@ -314,7 +334,6 @@ sys.exit()
 fig = go.Figure()
 
 # Transform coordinates: (x, z, y)
-pos = np.array([b.pos for b in bodies])
 x = pos[:, 0]
 y_ground = pos[:, 2]   # z-axis in simulation → horizontal ground axis
 z_up = pos[:, 1]       # y in simulation → vertical axis
@@ -327,7 +346,7 @@ fig.add_trace(go.Scatter3d(
     z=z_up,
     mode='markers+text',
     marker=dict(
-        size=diam * 20,
+        size=d_arr * 20,
         color=clusters,
         colorscale='Viridis',
         opacity=0.8,
@@ -338,17 +357,15 @@ fig.add_trace(go.Scatter3d(
     name="Objects"
 ))
 
-# Attractors as red Xs on the ground (y=0 in sim → z=0 in plot)
-for i, b in enumerate(bodies):
-    for att in b.attractors:
-        fig.add_trace(go.Scatter3d(
-            x=[att["x"]],
-            y=[att["z"]],
-            z=[0],
-            mode='markers',
-            marker=dict(size=6, color='red', symbol='x'),
-            name=f"Attractor Obj {i+1}"
-        ))
+# Attractors as red Xs on the ground (y=0 in sim → z=0 in plot), one trace for all
+fig.add_trace(go.Scatter3d(
+    x=att_x,
+    y=att_z,
+    z=np.zeros_like(att_x),
+    mode='markers',
+    marker=dict(size=6, color='red', symbol='x'),
+    name="Attractors"
+))
 
 # Add a transparent ground plane for reference
 plane_size = 15
@@ -1,11 +1,11 @@
 import numpy as np
-from numba import njit, prange
+from numba import njit, prange, get_thread_id, config, cuda, float32
+import math
 import time
 import pandas as pd
 import sys
 import signal 
 import json
-import random 
 
 # ============================================================
 # Pairwise repulsive force (graph-like)
@@ -13,39 +13,320 @@ import random
 
 DIAM = 1  # particle diameter
 
+# Simple repulsive force between two particles,
+#   F_i = -k_rep * rij / (r^2 + eps),  rij = r_j - r_i
+# pointing away from j. The denominator is inverse-square but rij carries
+# one power of r, so |F| ~ k_rep / r; the layout parameters (rcut, step
+# sizes, thresholds) are tuned for this law. No square root is needed.
+# Evaluated inline in the force kernels.
+K_REP = 1.0     # repulsion constant
+EPS_REP = 1e-6  # softening, keeps coincident particles finite
+
+
+# ============================================================
+# Spatial cell list for the cutoff search
+# ============================================================
+
+@njit(fastmath=True)
+def build_cell_list(pos, rcut):
+    """
+    Bucket particles into a uniform grid of cubic cells with edge rcut,
+    so every partner within the cutoff lies in the same or one of the 26
+    neighbouring cells.
+
+    Parameters
+    ----------
+    pos : (N,3)
+        Particle positions.
+    rcut : float
+        Cutoff distance, used as the cell edge length.
+
+    Returns
+    -------
+    cell_head : (C,) int
+        First particle in each cell (-1 if empty), cells flattened row-major.
+    next_in_cell : (N,) int
+        Next particle in the same cell (-1 at the end of the chain).
+    cell_idx : (N,3) int
+        Grid coordinates of each particle's cell.
+    dims : (3,) int
+        Number of cells along each axis.
+    """
+    n = pos.shape[0]
+    lo = np.empty(3)
+    hi = np.empty(3)
+    for k in range(3):
+        lo[k] = pos[0,k]
+        hi[k] = pos[0,k]
+    for i in range(1, n):
+        for k in range(3):
+            lo[k] = min(lo[k], pos[i,k])
+            hi[k] = max(hi[k], pos[i,k])
+
+    dims = np.empty(3, dtype=np.int64)
+    for k in range(3):
+        dims[k] = int((hi[k] - lo[k]) / rcut) + 1
+
+    cell_head = np.full(dims[0] * dims[1] * dims[2], -1, dtype=np.int64)
+    next_in_cell = np.empty(n, dtype=np.int64)
+    cell_idx = np.empty((n, 3), dtype=np.int64)
+    for i in range(n):
+        for k in range(3):
+            cell_idx[i,k] = min(int((pos[i,k] - lo[k]) / rcut), dims[k] - 1)
+        c = (cell_idx[i,0] * dims[1] + cell_idx[i,1]) * dims[2] + cell_idx[i,2]
+        next_in_cell[i] = cell_head[c]
+        cell_head[c] = i
+
+    return cell_head, next_in_cell, cell_idx, dims
+
+
+# ============================================================
+# Verlet neighbour list (cutoff + skin), rebuilt only when needed
+# ============================================================
 
 @njit(inline='always', fastmath=True)
-def pair_force(rij, r2, k_rep=.1):
+def scan_cells(i, pos, rl2, cell_head, next_in_cell, cell_idx, dims, row):
+    """
+    Find the particles j > i within sqrt(rl2) of particle i in the 27
+    cells around it. The first len(row) of them are written to row; the
+    return value is the total count, so an empty row just counts.
+    """
+    count = 0
+    px = pos[i,0]
+    py = pos[i,1]
+    pz = pos[i,2]
+    for cx in range(max(cell_idx[i,0] - 1, 0), min(cell_idx[i,0] + 2, dims[0])):
+        for cy in range(max(cell_idx[i,1] - 1, 0), min(cell_idx[i,1] + 2, dims[1])):
+            for cz in range(max(cell_idx[i,2] - 1, 0), min(cell_idx[i,2] + 2, dims[2])):
+                j = cell_head[(cx * dims[1] + cy) * dims[2] + cz]
+                while j != -1:
+                    if j > i:
+                        dx = pos[j,0] - px
+                        dy = pos[j,1] - py
+                        dz = pos[j,2] - pz
+                        if dx*dx + dy*dy + dz*dz < rl2:
+                            if count < row.shape[0]:
+                                row[count] = j
+                            count += 1
+                    j = next_in_cell[j]
+    return count
+
+
+@njit(inline='always', fastmath=True)
+def scan_all(i, pos, rl2, row):
+    """
+    All-pairs counterpart of scan_cells, same contract: the particles
+    j > i within sqrt(rl2) of particle i, written to row and counted.
     """
-    Simple inverse-square repulsive force between two particles.
-    F = k_rep * rij / (r^2 + eps)
+    count = 0
+    px = pos[i,0]
+    py = pos[i,1]
+    pz = pos[i,2]
+    for j in range(i + 1, pos.shape[0]):
+        dx = pos[j,0] - px
+        dy = pos[j,1] - py
+        dz = pos[j,2] - pz
+        if dx*dx + dy*dy + dz*dz < rl2:
+            if count < row.shape[0]:
+                row[count] = j
+            count += 1
+    return count
+
+
+# Below this many cells along every axis the 27-cell stencil covers the
+# whole box and prunes nothing; the list is then built from all pairs.
+MIN_CELLS = 3
+
+
+@njit(parallel=True, fastmath=True)
+def build_neighbor_list(pos, rlist):
+    """
+    Half Verlet list: for each particle i the partners j > i closer than
+    rlist = rcut + skin. As long as no particle has moved more than skin/2
+    since the build, every pair inside rcut is still on the list.
+    Stored compressed (CSR), so memory follows the pair count rather than
+    N times the longest row.
 
     Parameters
     ----------
-    rij : (3,) float
-        Displacement vector r_j - r_i.
-    r2 : float
-        Squared distance between i and j.
-    k_rep : float
-        Repulsion constant.
+    pos : (N,3)
+        Particle positions.
+    rlist : float
+        List radius, cutoff plus skin.
 
     Returns
     -------
-    (3,) float
-        Force on particle i (points away from j).
+    nbr : (P,) int32
+        Partner indices of all particles, back to back.
+    nbr_start : (N+1,) int
+        Partners of particle i are nbr[nbr_start[i]:nbr_start[i+1]].
     """
-    eps = 1e-6
-    inv_r = 1.0 / np.sqrt(r2 + eps)
-    fmag = k_rep * inv_r * inv_r
-    return -rij * fmag  # push away
+    n = pos.shape[0]
+    rl2 = rlist * rlist
+    cell_head, next_in_cell, cell_idx, dims = build_cell_list(pos, rlist)
+    use_cells = dims.max() >= MIN_CELLS
+
+    # count pass, offsets, then fill each particle's segment
+    nbr_count = np.zeros(n, dtype=np.int64)
+    empty = np.empty(0, dtype=np.int32)
+    for i in prange(n):
+        if use_cells:
+            nbr_count[i] = scan_cells(i, pos, rl2, cell_head, next_in_cell, cell_idx, dims, empty)
+        else:
+            nbr_count[i] = scan_all(i, pos, rl2, empty)
+    nbr_start = np.zeros(n + 1, dtype=np.int64)
+    nbr_start[1:] = np.cumsum(nbr_count)
+    nbr = np.empty(nbr_start[n], dtype=np.int32)
+    for i in prange(n):
+        row = nbr[nbr_start[i]:nbr_start[i + 1]]
+        if use_cells:
+            scan_cells(i, pos, rl2, cell_head, next_in_cell, cell_idx, dims, row)
+        else:
+            scan_all(i, pos, rl2, row)
+
+    return nbr, nbr_start
+
+
+@njit(fastmath=True)
+def max_displacement2(pos, pos_ref):
+    """Largest squared distance any particle has moved from pos_ref."""
+    d2max = 0.0
+    for i in range(pos.shape[0]):
+        dx = pos[i,0] - pos_ref[i,0]
+        dy = pos[i,1] - pos_ref[i,1]
+        dz = pos[i,2] - pos_ref[i,2]
+        d2max = max(d2max, dx*dx + dy*dy + dz*dz)
+    return d2max
 
 
 # ============================================================
 # Compute total forces
 # ============================================================
 
+@njit(inline='always', fastmath=True)
+def accumulate_repulsion(i, pos, rc2, nbr, nbr_start, scratch):
+    """
+    Pairwise repulsion between particle i and its list partners j > i
+    within the cutoff. Each pair is evaluated once and applied equal &
+    opposite (F[i] += f, F[j] -= f) into the calling thread's slice of
+    scratch, so no two threads write to the same memory.
+
+    Parameters
+    ----------
+    i : int
+        Particle index.
+    pos : (N,3)
+        Particle positions.
+    rc2 : float
+        Squared cutoff distance for pairwise interactions.
+    nbr, nbr_start
+        Neighbour list from build_neighbor_list().
+    scratch : (T,N,3)
+        Per-thread force accumulators, indexed by get_thread_id().
+    """
+    tid = get_thread_id()
+    px = pos[i,0]
+    py = pos[i,1]
+    pz = pos[i,2]
+    fx = 0.0
+    fy = 0.0
+    fz = 0.0
+    for k in range(nbr_start[i], nbr_start[i + 1]):
+        j = nbr[k]
+        dx = pos[j,0] - px
+        dy = pos[j,1] - py
+        dz = pos[j,2] - pz
+        r2 = dx*dx + dy*dy + dz*dz
+        if r2 < rc2:
+            fmag = K_REP / (r2 + EPS_REP)
+            fx -= dx * fmag  # push away
+            fy -= dy * fmag
+            fz -= dz * fmag
+            scratch[tid,j,0] += dx * fmag  # equal & opposite
+            scratch[tid,j,1] += dy * fmag
+            scratch[tid,j,2] += dz * fmag
+    scratch[tid,i,0] += fx
+    scratch[tid,i,1] += fy
+    scratch[tid,i,2] += fz
+
+
+@njit(fastmath=True)
+def accumulate_attractors(pos, attr_pos_T, attr_k_T, out):
+    """
+    Add the particle-specific attractor pulls to out, f = -k * (p - p_attr)
+    per axis. The attractor data is stored axis-major so the innermost
+    loop runs over contiguous particles and vectorizes; unused attractors
+    have k = 0 and simply contribute nothing.
+
+    Parameters
+    ----------
+    pos : (N,3)
+        Particle positions.
+    attr_pos_T : (A,3,N)
+        Attractor positions, attr_pos_T[a, axis, i].
+    attr_k_T : (A,3,N)
+        Per-axis attractor strengths, same layout.
+    out : (N,3)
+        Force accumulator, updated in place.
+    """
+    amax = attr_pos_T.shape[0]
+    n = attr_pos_T.shape[2]
+    for a in range(amax):
+        for axis in range(3):
+            k = attr_k_T[a,axis]
+            p = attr_pos_T[a,axis]
+            for i in range(n):
+                out[i,axis] -= k[i] * (pos[i,axis] - p[i])
+
+
+@njit(inline='always', fastmath=True)
+def particle_force(i, pos, scratch):
+    """
+    Total force on particle i: the repulsion and attractor pulls gathered
+    in scratch plus the ground plane.
+
+    Parameters
+    ----------
+    i : int
+        Particle index.
+    pos : (N,3)
+        Particle positions.
+    scratch : (T,N,3)
+        Per-thread force accumulators, summed here over threads.
+
+    Returns
+    -------
+    (fx, fy, fz) : float
+        Force on particle i, as scalars so nothing is allocated per particle.
+    """
+    # Reduce over the per-thread slices
+    fx = 0.0
+    fy = 0.0
+    fz = 0.0
+    for t in range(scratch.shape[0]):
+        fx += scratch[t,i,0]
+        fy += scratch[t,i,1]
+        fz += scratch[t,i,2]
+
+    py = pos[i,1]
+    if py < DIAM:  # diameter 1
+        # ground plane repulsion
+        fy += 100 * (1 - py)  # push up
+
+    return fx, fy, fz
+
+
+def new_scratch(pos):
+    """
+    Per-thread (T,N,3) force accumulator for the pairwise repulsion (and,
+    in slice 0, the attractor pulls), one slice for every thread Numba
+    may launch.
+    """
+    return np.zeros((config.NUMBA_NUM_THREADS,) + pos.shape, dtype=pos.dtype)
+
+
 @njit(parallel=True, fastmath=True)
-def compute_forces(pos, rcut, attr_pos, attr_k):
+def compute_forces(pos, rcut, attr_pos_T, attr_k_T, scratch, forces):
     """
     Compute total forces on all particles:
       - pairwise repulsion (for layout spacing)
@@ -57,83 +338,309 @@ def compute_forces(pos, rcut, attr_pos, attr_k):
         Particle positions.
     rcut : float
         Cutoff distance for pairwise interactions.
-    attr_pos : (N,A,3)
-        Attractor positions for each particle (A per particle).
-    attr_k : (N,A,3)
-        Per-axis strengths for each attractor (A per particle).
+    attr_pos_T : (A,3,N)
+        Attractor positions, A per particle, axis-major (see accumulate_attractors).
+    attr_k_T : (A,3,N)
+        Per-axis strengths for each attractor, same layout.
+    scratch : (T,N,3)
+        Per-thread force accumulators from new_scratch(); overwritten.
+    forces : (N,3)
+        Caller-allocated output buffer; every row is overwritten.
 
     Returns
     -------
     forces : (N,3)
-        Total force on each particle.
+        Total force on each particle (the buffer passed in).
     """
     n = pos.shape[0]
-    amax = attr_pos.shape[1]
-    forces = np.zeros_like(pos)
     rc2 = rcut * rcut
+    nbr, nbr_start = build_neighbor_list(pos, rcut)
 
-    # Pairwise repulsion
+    scratch[:] = 0.0
     for i in prange(n):
-        fi = np.zeros(3, dtype=pos.dtype)
-        pi = pos[i]
-        for j in range(n):
-            if j == i:
-                continue
-            rij = pos[j] - pi
-            r2 = rij[0]*rij[0] + rij[1]*rij[1] + rij[2]*rij[2]
-            if r2 < rc2:
-                fi += pair_force(rij, r2, 1)
-        forces[i] = fi
-
-    # Add particle-specific attractor pulls
+        accumulate_repulsion(i, pos, rc2, nbr, nbr_start, scratch)
+    accumulate_attractors(pos, attr_pos_T, attr_k_T, scratch[0])
+
     for i in prange(n):
-        px, py, pz = pos[i]
-        for a in range(amax):
-            kx, ky, kz = attr_k[i,a]
-            ax, ay, az = attr_pos[i,a]
-            if kx != 0.0:
-                forces[i,0] += -kx * (px - ax)
-            if ky != 0.0:
-                forces[i,1] += -ky * (py - ay)
-            if kz != 0.0:
-                forces[i,2] += -kz * (pz - az)
-        if py < DIAM:  # diameter 1
-            # ground plane repulsion
-            forces[i,1] += 100 * (1 - py)  # push up
+        fx, fy, fz = particle_force(i, pos, scratch)
+        forces[i,0] = fx
+        forces[i,1] = fy
+        forces[i,2] = fz
 
     return forces
 
 
 # ============================================================
-# Position update (no physics)
+# Fused relaxation step (forces + position update + residual)
 # ============================================================
 
 @njit(parallel=True, fastmath=True)
-def apply_forces(pos, forces, step_size=0.05, max_disp=1.0, min_force=1e-2):
+def step_kernel(pos, new_pos, attr_pos_T, attr_k_T, rcut, nbr, nbr_start, scratch, step_size=0.05, max_disp=1.0, min_force=1e-2):
     """
-    Move particles in direction of total force, scaled down
-    for stability.
+    One relaxation step: compute the force on each particle, move it in
+    the direction of that force (scaled down for stability) and sum the
+    force magnitudes. The symmetric pair sweep runs first; a single pass
+    over the particles then finishes the forces, moves them and sums
+    the residual.
+
+    Forces are evaluated at the old positions in pos; the updated positions
+    are written to new_pos so particles handled in parallel never see each
+    other's half-updated state. The caller swaps the two buffers.
 
     Parameters
     ----------
     pos : (N,3)
-        Particle positions.
-    forces : (N,3)
-        Total forces from compute_forces().
+        Particle positions at the start of the step.
+    new_pos : (N,3)
+        Output buffer for the updated positions.
+    attr_pos_T : (A,3,N)
+        Attractor positions, A per particle, axis-major (see accumulate_attractors).
+    attr_k_T : (A,3,N)
+        Per-axis strengths for each attractor, same layout.
+    rcut : float
+        Cutoff distance for pairwise interactions.
+    nbr, nbr_start
+        Neighbour list from build_neighbor_list(), still valid for pos.
+    scratch : (T,N,3)
+        Per-thread force accumulators from new_scratch(); overwritten.
     step_size : float
         Global scale for movement per iteration.
     max_disp : float
         Maximum distance a particle can move in one step.
+    min_force : float
+        Particles with a smaller force magnitude are not moved.
+
+    Returns
+    -------
+    total_force : float
+        Sum of the force magnitudes over all particles.
     """
     n = pos.shape[0]
+    rc2 = rcut * rcut
+
+    scratch[:] = 0.0
     for i in prange(n):
-        f = forces[i]
-        norm = np.sqrt(f[0]*f[0] + f[1]*f[1] + f[2]*f[2])
+        accumulate_repulsion(i, pos, rc2, nbr, nbr_start, scratch)
+    accumulate_attractors(pos, attr_pos_T, attr_k_T, scratch[0])
+
+    total_force = 0.0
+    for i in prange(n):
+        fx, fy, fz = particle_force(i, pos, scratch)
+        norm = np.sqrt(fx*fx + fy*fy + fz*fz)
+        scale = 0.0
         if norm > min_force:
             scale = min(step_size, max_disp / norm)
-            pos[i,0] += f[0] * scale
-            pos[i,1] += f[1] * scale
-            pos[i,2] += f[2] * scale
+        new_pos[i,0] = pos[i,0] + fx * scale
+        new_pos[i,1] = pos[i,1] + fy * scale
+        new_pos[i,2] = pos[i,2] + fz * scale
+        total_force += norm
+    return total_force
+
+
+# ============================================================
+# Batched driver: many steps per call, no Python between them
+# ============================================================
+
+@njit(fastmath=True)
+def run_batch(pos, pos_next, pos_ref, best_pos, attr_pos_T, attr_k_T, rcut, skin, scratch,
+              step_size, max_disp, force_threshold, best_force, force_range, n_steps):
+    """
+    Run up to n_steps relaxation steps without returning to Python.
+
+    Per step: rebuild the neighbour list if a particle moved more than
+    skin/2 since the last build, call step_kernel, pick the coarse or fine
+    step (force_range) from the residual, keep the positions with the
+    lowest residual in best_pos and stop early once converged.
+
+    Parameters
+    ----------
+    pos, pos_next : (N,3)
+        Current positions and a second buffer; the latest positions are
+        left in pos on return.
+    pos_ref : (N,3)
+        Scratch for the positions at the last neighbour list build.
+    best_pos : (N,3)
+        Positions at the lowest residual so far, updated in place.
+    attr_pos_T, attr_k_T : (A,3,N)
+        Attractor data, see step_kernel.
+    rcut, skin : float
+        Cutoff distance and neighbour list margin.
+    scratch : (T,N,3)
+        Per-thread force accumulators from new_scratch().
+    step_size, max_disp : (2,) float
+        Coarse and fine step parameters, indexed by force_range.
+    force_threshold : float
+        Stop once the total residual force falls below this.
+    best_force : float
+        Lowest residual so far.
+    force_range : int
+        Step parameter index carried over from the previous batch.
+    n_steps : int
+        Maximum number of steps to run.
+
+    Returns
+    -------
+    (steps, total_force, best_force, force_range, converged)
+        Steps actually run, the residual of the last step and the updated
+        carried-over state.
+    """
+    valid2 = (skin / 2) ** 2
+    nbr, nbr_start = build_neighbor_list(pos, rcut + skin)
+    pos_ref[:] = pos
+
+    cur = pos
+    nxt = pos_next
+    steps = 0
+    total_force = 0.0
+    converged = False
+    for _ in range(n_steps):
+        if max_displacement2(cur, pos_ref) > valid2:
+            nbr, nbr_start = build_neighbor_list(cur, rcut + skin)
+            pos_ref[:] = cur
+        total_force = step_kernel(cur, nxt, attr_pos_T, attr_k_T, rcut, nbr, nbr_start, scratch,
+                                  step_size[force_range], max_disp[force_range])
+        cur, nxt = nxt, cur
+        steps += 1
+
+        if total_force < 30:
+            force_range = 1  # switch to finer steps
+        else:
+            force_range = 0  # switch to coarser steps
+
+        # record best position, at minimal force. total_force was measured
+        # at the positions before this step's update, now held in nxt.
+        if total_force < best_force:
+            best_force = total_force
+            best_pos[:] = nxt
+
+        if total_force < force_threshold:
+            converged = True
+            break
+
+    if steps % 2 == 1:
+        pos[:] = cur
+    return steps, total_force, best_force, force_range, converged
+
+
+# ============================================================
+# GPU relaxation step (numba.cuda, used when a device is present)
+# ============================================================
+
+USE_CUDA = cuda.is_available()
+TPB = 128  # threads per block; also the number of positions staged per tile
+
+
+@cuda.jit(fastmath=True)
+def step_kernel_cuda(pos, new_pos, attr_pos_T, attr_k_T, rc2, step_size, max_disp, min_force, norms):
+    """
+    GPU version of step_kernel, one thread per particle. Pair partners are
+    streamed through shared memory in tiles of TPB positions (the classic
+    N-body tiling) instead of using a cell list. The attractor arrays are
+    axis-major, so neighbouring threads read neighbouring addresses.
+
+    Writes the updated positions to new_pos and |F[i]| to norms[i]; the
+    caller sums norms on the device.
+    """
+    tile = cuda.shared.array(shape=(TPB, 3), dtype=float32)
+    n = pos.shape[0]
+    i = cuda.grid(1)
+    tx = cuda.threadIdx.x
+    active = i < n
+
+    px = float32(0.0)
+    py = float32(0.0)
+    pz = float32(0.0)
+    if active:
+        px = pos[i,0]
+        py = pos[i,1]
+        pz = pos[i,2]
+    fx = float32(0.0)
+    fy = float32(0.0)
+    fz = float32(0.0)
+
+    # Pairwise repulsion, same law as the CPU kernels
+    for start in range(0, n, TPB):
+        j = start + tx
+        if j < n:
+            tile[tx,0] = pos[j,0]
+            tile[tx,1] = pos[j,1]
+            tile[tx,2] = pos[j,2]
+        cuda.syncthreads()
+        if active:
+            for k in range(min(TPB, n - start)):
+                if start + k != i:
+                    dx = tile[k,0] - px
+                    dy = tile[k,1] - py
+                    dz = tile[k,2] - pz
+                    r2 = dx*dx + dy*dy + dz*dz
+                    if r2 < rc2:
+                        fmag = float32(K_REP) / (r2 + float32(EPS_REP))
+                        fx -= dx * fmag
+                        fy -= dy * fmag
+                        fz -= dz * fmag
+        cuda.syncthreads()
+
+    if not active:
+        return
+
+    # Particle-specific attractor pulls
+    for a in range(attr_pos_T.shape[0]):
+        fx -= attr_k_T[a,0,i] * (px - attr_pos_T[a,0,i])
+        fy -= attr_k_T[a,1,i] * (py - attr_pos_T[a,1,i])
+        fz -= attr_k_T[a,2,i] * (pz - attr_pos_T[a,2,i])
+    if py < DIAM:  # diameter 1
+        # ground plane repulsion
+        fy += float32(100.0) * (float32(1.0) - py)  # push up
+
+    norm = math.sqrt(fx*fx + fy*fy + fz*fz)
+    scale = float32(0.0)
+    if norm > min_force:
+        scale = min(step_size, max_disp / norm)
+    new_pos[i,0] = px + fx * scale
+    new_pos[i,1] = py + fy * scale
+    new_pos[i,2] = pz + fz * scale
+    norms[i] = norm
+
+
+sum_reduce = cuda.reduce(lambda a, b: a + b)
+
+
+def run_batch_cuda(dev, rcut, step_size, max_disp, force_threshold, best_force, force_range, n_steps):
+    """
+    GPU counterpart of run_batch with the same return value.
+    dev holds the device arrays ("pos", "pos_next", "best", "attr_pos_T",
+    "attr_k_T", "norms"); the two position buffers are swapped in it and
+    the lowest-residual positions are kept in dev["best"] on the device.
+    Each step is one kernel launch plus a device-side sum.
+    """
+    n = dev["pos"].shape[0]
+    blocks = (n + TPB - 1) // TPB
+    steps = 0
+    total_force = 0.0
+    converged = False
+    for _ in range(n_steps):
+        step_kernel_cuda[blocks, TPB](dev["pos"], dev["pos_next"], dev["attr_pos_T"], dev["attr_k_T"],
+                                      rcut * rcut, step_size[force_range], max_disp[force_range], 1e-2,
+                                      dev["norms"])
+        total_force = float(sum_reduce(dev["norms"]))
+        dev["pos"], dev["pos_next"] = dev["pos_next"], dev["pos"]
+        steps += 1
+
+        if total_force < 30:
+            force_range = 1  # switch to finer steps
+        else:
+            force_range = 0  # switch to coarser steps
+
+        # positions before this step's update are now in pos_next
+        if total_force < best_force:
+            best_force = total_force
+            dev["best"].copy_to_device(dev["pos_next"])
+
+        if total_force < force_threshold:
+            converged = True
+            break
+
+    return steps, total_force, best_force, force_range, converged
 
 
 # ============================================================
@@ -147,6 +654,7 @@ if __name__ == "__main__":
     np.random.seed(0)
     A = 9              # attractors per particle. max 6 countries. gravity, buoyancy, cluster (1)
     rcut = 50 * DIAM        # cutoff radius for pairwise repulsion  below 20 oscillations occur
+    skin = 2 * DIAM         # neighbour list margin; list is rebuilt after a move of skin/2
     step_size = [0.005,0.001]   # global movement scaling
     max_disp = [0.02,0.0005]     # per-step max displacement
     max_steps = 100000   # iteration limit
@@ -155,6 +663,10 @@ if __name__ == "__main__":
 
     df = pd.read_json("mcMatch_full.json")# [:500]
     N = len(df.index)
+    # pull the columns out once; the init below never touches the DataFrame per row
+    attractors_list = df["attractors"].tolist()
+    b_vals = df["b"].to_numpy(np.float32)
+    movie_ids = df["movie_id"].to_numpy()
 
     force_threshold *= N/300
 
@@ -162,28 +674,31 @@ if __name__ == "__main__":
     pos = np.zeros((N, 3), dtype=np.float32)
     attr_pos = np.zeros((N, A, 3), dtype=np.float32)
     attr_k   = np.zeros((N, A, 3), dtype=np.float32)
-    for i in range(N):
-        attractors = df.iloc[i].attractors[:A - 3]  # leave 3 attractors for gravity, age and cluster
-        # position from first attractor + b value        
-        pos[i,0] = attractors[0]["x"]
-        pos[i,1] = df.iloc[i].b
-        pos[i,2] = attractors[0]["z"]
-        # attractors, up to 6, set unused to 0 
-        for a in range(len(attractors)):
-            attr_pos[i,a] = np.array([attractors[a]["x"], df.iloc[i].b, attractors[a]["z"]], dtype=float)
-            attr_k[i,a] = np.array([10.0, 0.0, 10.0], dtype=float) # pull on x and z only
-        # unused attractors are set to 0 by default
-        # gravity attractor (pull down on y)
-        attr_k[i,A-3] = np.array([0.0, 0.0, 0.0], dtype=float)  # y only
-        # attr_k[i,A-3] = np.array([0.0, 5.0, 0.0], dtype=float)  # y only
-        attr_pos[i,A-3] = np.array([0.0, 0.0, 0.0], dtype=float)  # ground level
-        # age attractor (pull up on y) / buoyance
-        attr_k[i,A-2] = np.array([0.0, 20.0, 0.0], dtype=float)  # y only
-        attr_pos[i,A-2] = np.array([0.0, df.iloc[i].b, 0.0], dtype=float)  # ground level
-        # cluster attractor (pull all)
-        attr_k[i,A-1] = np.array([0.0, 0.0, 0.0], dtype=float)  # all axes
-        attr_pos[i,A-1] = np.array([0.0, 0.0, 0.0], dtype=float)  # center of space
-        
+
+    # map attractors, up to A - 3 per particle (leave 3 for gravity, age and cluster);
+    # unused slots stay 0. One flat (x, z) row per used attractor.
+    att_xz = np.array([(att["x"], att["z"]) for atts in attractors_list for att in atts[:A - 3]],
+                      dtype=np.float32)
+    n_att = np.array([min(len(atts), A - 3) for atts in attractors_list])
+    owner = np.repeat(np.arange(N), n_att)
+    slot = np.arange(len(owner)) - np.repeat(np.cumsum(n_att) - n_att, n_att)
+    attr_pos[owner, slot, 0] = att_xz[:, 0]
+    attr_pos[owner, slot, 1] = b_vals[owner]
+    attr_pos[owner, slot, 2] = att_xz[:, 1]
+    attr_k[owner, slot] = (10.0, 0.0, 10.0)  # pull on x and z only
+
+    # position from first attractor + b value
+    pos[:, 0] = attr_pos[:, 0, 0]
+    pos[:, 1] = b_vals
+    pos[:, 2] = attr_pos[:, 0, 2]
+
+    # gravity attractor (pull down on y): off, at ground level
+    # attr_k[:, A-3] = (0.0, 5.0, 0.0)  # y only
+    # age attractor (pull up on y) / buoyance
+    attr_k[:, A-2, 1] = 20.0  # y only
+    attr_pos[:, A-2, 1] = b_vals
+    # cluster attractor (pull all): off, at the center of space
+
     print(f"Initialized {N} particles.")
     nshow = min(10, N)
     print(f"Showing first {nshow} particles (pos, attractor positions and strengths, df row):")
@@ -192,6 +707,10 @@ if __name__ == "__main__":
         for a in range(attr_pos.shape[1]):
             print(f"  attractor[{a}] pos = {attr_pos[i,a].tolist()}, k = {attr_k[i,a].tolist()}")
 
+    # axis-major copies of the attractor data for the force kernels
+    attr_pos_T = attr_pos.transpose(1, 2, 0).copy()
+    attr_k_T   = attr_k.transpose(1, 2, 0).copy()
+
     # ------------------------------------------------------------
     # install a SIGINT handler that sets a flag so we can exit cleanly
     # ------------------------------------------------------------
@@ -216,43 +735,55 @@ if __name__ == "__main__":
 
     converged = False
     force_range = 0  # index for step_size and max_disp
+    step_size = np.asarray(step_size)
+    max_disp = np.asarray(max_disp)
+    pos_next = np.empty_like(pos)  # second position buffer for step_kernel
+    pos_ref = np.empty_like(pos)  # positions at the last neighbour list build
+    scratch = new_scratch(pos)
+    forces = np.zeros((N, 3), dtype=np.float32)  # residual force buffer for the report
+    best_force = np.inf
+    best_pos = pos.copy()  # reused buffer, only overwritten on improvement
+    if USE_CUDA:
+        # state stays on the device between steps; copied back only for output
+        print("Running the relaxation on the GPU.")
+        dev = {
+            "pos": cuda.to_device(pos),
+            "pos_next": cuda.device_array_like(pos),
+            "best": cuda.to_device(best_pos),
+            "attr_pos_T": cuda.to_device(attr_pos_T),
+            "attr_k_T": cuda.to_device(attr_k_T),
+            "norms": cuda.device_array(N, dtype=np.float32),
+        }
     try:
 
-        for step_i in range(1, max_steps + 1):
-            # Compute all forces (pairwise + individual attractors)
-            forces = compute_forces(pos, rcut, attr_pos, attr_k)
-            apply_forces(pos, forces, step_size[force_range], max_disp[force_range])
-
-            # debug:
-            #print(("forces: " + " {:8.4f}"*3).format(*forces[0] ))
-            #print(("pos:    " + " {:8.4f}"*3).format(*pos[0] )  )
-
-            # Compute convergence metric: total residual force
-            total_force = np.sum(np.linalg.norm(forces, axis=1))
-
-            if total_force < 30:
-                force_range = 1  # switch to finer steps
+        step_i = 0
+        while step_i < max_steps:
+            # Run the steps up to the next report in one call; the first batch
+            # is a single step so step 1 is reported. SIGINT is honoured between
+            # batches.
+            if step_i == 0:
+                n_steps = 1
             else:
-                force_range = 0  # switch to coarser steps
-
-            # record best position, at minimal force
-            if step_i > 1 and total_force < best_force:
-                best_force = total_force
-                best_pos = pos.copy()
+                n_steps = min(report_every - step_i % report_every, max_steps - step_i)
+            if USE_CUDA:
+                done, total_force, best_force, force_range, converged = run_batch_cuda(
+                    dev, rcut, step_size, max_disp, force_threshold,
+                    best_force, force_range, n_steps)
             else:
-                best_force = total_force
-                best_pos = pos.copy()
+                done, total_force, best_force, force_range, converged = run_batch(
+                    pos, pos_next, pos_ref, best_pos, attr_pos_T, attr_k_T, rcut, skin, scratch,
+                    step_size, max_disp, force_threshold, best_force, force_range, n_steps)
+            step_i += done
 
             # Print progress
             if step_i % report_every == 0 or step_i == 1:
                 print(f"Step {step_i:5d} | total |F| = {total_force:.4e}")
 
             # Convergence check
-            if total_force < force_threshold:
+            if converged:
                 print(f"Converged at step {step_i}")
-                converged = True
                 break
-            
+
             if _stop_flag["stop"]:
                 print("Stop requested, breaking simulation loop.")
                 break
@@ -265,7 +796,9 @@ if __name__ == "__main__":
         # restore original SIGINT handler
         signal.signal(signal.SIGINT, _orig_sigint)
 
-
+    if USE_CUDA:
+        pos = dev["pos"].copy_to_host()
+        dev["best"].copy_to_host(best_pos)
 
     t1 = time.time()
     print(f"Finished in {t1 - t0:.2f} s")
@@ -278,13 +811,23 @@ if __name__ == "__main__":
 
 
     print("Convergence status:", "Converged" if converged else "Not converged")
-    
+
+    # Residual forces at the best positions, for the report and the JSON output
+    compute_forces(best_pos, rcut, attr_pos_T, attr_k_T, scratch, forces)
+
+    # Cosmetic rotation/orbit parameters, drawn in one batch per field
+    rng = np.random.default_rng()
+    rot_speed  = rng.uniform(0, .1, N)
+    rot_angle  = rng.uniform(0, 6.2, N)
+    orb_radius = rng.integers(3, 20, N, endpoint=True)
+    orb_speed  = rng.uniform(0, .01, N)
+
     objects_json = []
 
     for i in range(N):
         obj_entry = {
             "mesh": None,
-            "idx": int(df.iloc[i].movie_id),
+            "idx": int(movie_ids[i]),
             "name": f"obj{i+1}",
             "emissive": False,
             "map": None,
@@ -300,13 +843,13 @@ if __name__ == "__main__":
             "parm_c": float(attr_k[i][-1][0]),
             "diameter": DIAM,
             "rotation": {
-                "speed": random.uniform(0, .1),
-                "angle": random.uniform(0,6.2),
+                "speed": float(rot_speed[i]),
+                "angle": float(rot_angle[i]),
                 "active": True
             },
             "orbit": {
-                "radius": random.randint(3,20),
-                "speed": random.uniform(0, .01),
+                "radius": int(orb_radius[i]),
+                "speed": float(orb_speed[i]),
                 "angle": .1,
                 "active": True
             },
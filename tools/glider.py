@@ -1,55 +1,67 @@
-import os, json, struct, math
-from PIL import Image, ImageDraw, ImageFilter
+import os, io, json, struct, shutil
+import numpy as np
+from PIL import Image, ImageFilter
+try:
+    import orjson
+    def dumps_compact(obj): return orjson.dumps(obj)
+    def dumps_pretty(obj): return orjson.dumps(obj,option=orjson.OPT_INDENT_2)
+except ImportError:
+    def dumps_compact(obj): return json.dumps(obj,separators=(',',':')).encode("utf8")
+    def dumps_pretty(obj): return json.dumps(obj,indent=2).encode("utf8")
 
 # === OUTPUT DIRECTORY ===
 OUT_DIR = "space_glider_v4"
+# .gltf + .bin sidecar for inspection; the app only loads the .glb, so CI skips it
+WRITE_SIDECAR = not os.environ.get("CI")
 os.makedirs(OUT_DIR, exist_ok=True)
 
 # === GEOMETRY HELPERS ===
 def ellipsoid(rx, ry, rz, seg_u=48, seg_v=24):
-    pos=[]; idx=[]
-    for v in range(seg_v+1):
-        phi=math.pi*v/seg_v
-        for u in range(seg_u+1):
-            theta=2*math.pi*u/seg_u
-            x=math.sin(phi)*math.cos(theta)
-            y=math.cos(phi)
-            z=math.sin(phi)*math.sin(theta)
-            pos += [rx*x, ry*y, rz*z]
-    for v in range(seg_v):
-        for u in range(seg_u):
-            a=v*(seg_u+1)+u
-            b=a+seg_u+1
-            idx += [a,b,a+1,b,b+1,a+1]
+    # (seg_v+1) x (seg_u+1) vertex grid over phi (rows) and theta (columns)
+    phi=np.pi*np.arange(seg_v+1)/seg_v
+    theta=2*np.pi*np.arange(seg_u+1)/seg_u
+    PH,TH=np.meshgrid(phi,theta,indexing="ij")
+    sp=np.sin(PH)
+    pos=np.stack([rx*sp*np.cos(TH), ry*np.cos(PH), rz*sp*np.sin(TH)],-1).ravel()
+    # two triangles per grid quad, a=top-left corner, b=the one below it
+    a=(np.arange(seg_v)[:,None]*(seg_u+1)+np.arange(seg_u)).ravel()
+    b=a+seg_u+1
+    idx=np.stack([a,b,a+1,b,b+1,a+1],-1).ravel()
+    return pos, idx
+
+def ring(radius, seg):
+    """cos/sin table for seg segments, seg+1 entries so ring[i+1] closes at i=seg-1."""
+    t=2*np.pi*np.arange(seg+1)/seg
+    return radius*np.cos(t), radius*np.sin(t)
+
+def cap(C, S, z, center, top):
+    """Triangle fan for a flat cap at height z: a center vertex plus one
+    (i, i+1) rim vertex pair per segment, as in the original per-segment loop."""
+    seg=len(C)-1
+    rim=np.empty((seg,2,3))
+    rim[:,0,0]=C[:-1]; rim[:,0,1]=S[:-1]
+    rim[:,1,0]=C[1:];  rim[:,1,1]=S[1:]
+    rim[:,:,2]=z
+    pos=np.concatenate([[0,0,z],rim.ravel()])
+    n=center+3+2*np.arange(seg)  # vertex count after each segment's pair
+    idx=np.stack([np.full(seg,center),n-1,n-2] if top else [np.full(seg,center),n-2,n-1],-1).ravel()
     return pos, idx
 
 def cylinder(radius=0.35,length=0.9,seg=32):
-    pos=[]; idx=[]; h=length/2
-    for i in range(seg+1):
-        t=2*math.pi*i/seg; x=math.cos(t); y=math.sin(t)
-        for z in (-h,h):
-            pos += [radius*x, radius*y, z]
-    for i in range(seg):
-        a=2*i; b=a+1; c=a+2; d=a+3
-        idx += [a,b,c,b,d,c]
+    h=length/2
+    C,S=ring(radius,seg)
+    side=np.empty((seg+1,2,3))
+    side[:,:,0]=C[:,None]; side[:,:,1]=S[:,None]
+    side[:,0,2]=-h; side[:,1,2]=h
+    a=2*np.arange(seg); b=a+1; c=a+2; d=a+3
+    side_idx=np.stack([a,b,c,b,d,c],-1).ravel()
     # simple caps
-    base_center = len(pos)//3
-    pos += [0,0,-h]
-    for i in range(seg):
-        t1=2*math.pi*i/seg; t2=2*math.pi*(i+1)/seg
-        pos += [radius*math.cos(t1), radius*math.sin(t1), -h]
-        pos += [radius*math.cos(t2), radius*math.sin(t2), -h]
-        n=len(pos)//3
-        idx += [base_center, n-2, n-1]
-    top_center = len(pos)//3
-    pos += [0,0,h]
-    for i in range(seg):
-        t1=2*math.pi*i/seg; t2=2*math.pi*(i+1)/seg
-        pos += [radius*math.cos(t1), radius*math.sin(t1), h]
-        pos += [radius*math.cos(t2), radius*math.sin(t2), h]
-        n=len(pos)//3
-        idx += [top_center, n-1, n-2]
-    return pos, idx
+    base_center=2*(seg+1)
+    base_pos,base_idx=cap(C,S,-h,base_center,False)
+    top_center=base_center+1+2*seg
+    top_pos,top_idx=cap(C,S,h,top_center,True)
+    return (np.concatenate([side.ravel(),base_pos,top_pos]),
+            np.concatenate([side_idx,base_idx,top_idx]))
 
 def wing(sign=1,thick=0.05):
     span,root,tip,sweep=4.0,1.6,0.8,0.6; z0=-0.3
@@ -68,39 +80,26 @@ def wing(sign=1,thick=0.05):
 # --- correct thruster geometry ---
 def make_thruster(radius=0.35, length=0.9, seg=32):
     """Closed cylinder oriented along Z, normals facing outward."""
-    pos=[]; idx=[]
     h = length / 2
-    # side vertices
-    for i in range(seg):
-        theta = 2 * math.pi * i / seg
-        x = radius * math.cos(theta)
-        y = radius * math.sin(theta)
-        pos += [x, y, -h, x, y, h]
+    # cos/sin evaluated once, shared by the side and both caps
+    C, S = ring(radius, seg)
+    # side vertices: (x, y, -h), (x, y, h) per segment
+    side = np.empty((seg, 2, 3))
+    side[:, :, 0] = C[:-1, None]
+    side[:, :, 1] = S[:-1, None]
+    side[:, 0, 2] = -h
+    side[:, 1, 2] = h
     # side faces
-    for i in range(seg):
-        a = 2 * i
-        b = (2 * ((i + 1) % seg))
-        idx += [a, b, a + 1, b, b + 1, a + 1]
+    a = 2 * np.arange(seg)
+    b = 2 * ((np.arange(seg) + 1) % seg)
+    side_idx = np.stack([a, b, a + 1, b, b + 1, a + 1], -1).ravel()
     # caps
-    base_center = len(pos) // 3
-    pos += [0, 0, -h]
-    for i in range(seg):
-        t1 = 2 * math.pi * i / seg
-        t2 = 2 * math.pi * (i + 1) / seg
-        pos += [radius * math.cos(t1), radius * math.sin(t1), -h]
-        pos += [radius * math.cos(t2), radius * math.sin(t2), -h]
-        n = len(pos) // 3
-        idx += [base_center, n - 2, n - 1]
-    top_center = len(pos) // 3
-    pos += [0, 0, h]
-    for i in range(seg):
-        t1 = 2 * math.pi * i / seg
-        t2 = 2 * math.pi * (i + 1) / seg
-        pos += [radius * math.cos(t1), radius * math.sin(t1), h]
-        pos += [radius * math.cos(t2), radius * math.sin(t2), h]
-        n = len(pos) // 3
-        idx += [top_center, n - 1, n - 2]
-    return pos, idx
+    base_center = 2 * seg
+    base_pos, base_idx = cap(C, S, -h, base_center, False)
+    top_center = base_center + 1 + 2 * seg
+    top_pos, top_idx = cap(C, S, h, top_center, True)
+    return (np.concatenate([side.ravel(), base_pos, top_pos]),
+            np.concatenate([side_idx, base_idx, top_idx]))
 
 
 
@@ -111,13 +110,17 @@ wL_pos, wL_idx = wing(-1)
 
 # replace your old `cylinder()` calls
 t_pos, t_idx = make_thruster()
+# the two thrusters are the same mesh shifted along X
+t_xyz = np.asarray(t_pos).reshape(-1, 3)
+tL_pos = t_xyz.copy(); tL_pos[:, 0] -= 0.7
+tR_pos = t_xyz.copy(); tR_pos[:, 0] += 0.7
 
 parts = [
     ("Fuselage", f_pos, f_idx, "Hull"),
     ("WingRight", wR_pos, wR_idx, "Hull"),
     ("WingLeft", wL_pos, wL_idx, "Hull"),
-    ("ThrusterLeft",  [x-0.7 if i%3==0 else x for i,x in enumerate(t_pos)], t_idx, "ThrusterLeftMat"),
-    ("ThrusterRight", [x+0.7 if i%3==0 else x for i,x in enumerate(t_pos)], t_idx, "ThrusterRightMat"),
+    ("ThrusterLeft",  tL_pos.ravel(), t_idx, "ThrusterLeftMat"),
+    ("ThrusterRight", tR_pos.ravel(), t_idx, "ThrusterRightMat"),
 ]
 
 
@@ -127,42 +130,55 @@ def save_png(img, name):
 
 def base_color():
     W=H=1024
-    img = Image.new("RGBA",(W,H),(215,220,230,255))
-    d = ImageDraw.Draw(img)
+    arr = np.empty((H,W,4),np.uint8); arr[:] = (215,220,230,255)
     for step in (64,96,128):
-        for x in range(0,W,step):
-            d.line([(x,0),(x,H)], fill=(185,190,200,255))
-        for y in range(0,H,step):
-            d.line([(0,y),(W,y)], fill=(185,190,200,255))
-    return img.filter(ImageFilter.GaussianBlur(0.5))
+        arr[::step] = (185,190,200,255); arr[:,::step] = (185,190,200,255)
+    return Image.fromarray(arr,"RGBA").filter(ImageFilter.GaussianBlur(0.5))
+
+_solid_cache={}
+def solid_png(color):
+    # uniform maps sample identically at any size: encode a 1x1 PNG once per colour
+    if color not in _solid_cache:
+        buf=io.BytesIO(); Image.new("RGBA" if len(color)==4 else "RGB",(1,1),color).save(buf,"PNG")
+        _solid_cache[color]=buf.getvalue()
+    return _solid_cache[color]
+
+def save_solid(color, name):
+    with open(os.path.join(OUT_DIR,name),"wb") as f: f.write(solid_png(color))
+    return name
 
 save_png(base_color(), "baseColor.png")
-Image.new("RGB",(1024,1024),(0,90,220)).save(os.path.join(OUT_DIR,"metallicRoughness.png"))
-Image.new("RGB",(1024,1024),(128,128,255)).save(os.path.join(OUT_DIR,"normal.png"))
-Image.new("RGB",(1024,1024),(0,0,0)).save(os.path.join(OUT_DIR,"emissive.png"))
+save_solid((0,90,220), "metallicRoughness.png")
+save_solid((128,128,255), "normal.png")
+save_solid((0,0,0), "emissive.png")
 
-Image.new("RGBA",(512,512),(190,195,205,255)).save(os.path.join(OUT_DIR,"thruster_baseColor.png"))
-Image.new("RGB",(512,512),(0,90,200)).save(os.path.join(OUT_DIR,"thruster_metallicRoughness.png"))
-Image.new("RGB",(512,512),(128,128,255)).save(os.path.join(OUT_DIR,"thruster_normal.png"))
-Image.new("RGB",(512,512),(0,0,0)).save(os.path.join(OUT_DIR,"thruster_emissive.png"))
+save_solid((190,195,205,255), "thruster_baseColor.png")
+save_solid((0,90,200), "thruster_metallicRoughness.png")
+save_solid((128,128,255), "thruster_normal.png")
+save_solid((0,0,0), "thruster_emissive.png")
 
 # === BUILD GLTF STRUCTURE ===
-bin_data=bytearray()
+bin_buf=io.BytesIO()
 bufferViews=[]; accessors=[]; meshes=[]; nodes=[]
 
-def align4(n): return (4-(n%4))%4
+def write_aligned(data):
+    # append to the stream, zero-pad to a 4-byte boundary, return the start offset
+    off=bin_buf.tell(); bin_buf.write(data); bin_buf.write(b"\x00"*((-bin_buf.tell())&3))
+    return off
 
 def add_mesh(name, pos, idx, mat_index):
-    pos_bytes=struct.pack("<%sf"%len(pos),*pos)
-    p_off=len(bin_data); bin_data.extend(pos_bytes); bin_data.extend(b"\x00"*align4(len(bin_data)))
+    # lists or arrays; packed as little-endian float32 / uint16 in one copy each
+    pos_arr=np.ascontiguousarray(pos,dtype="<f4"); idx_arr=np.ascontiguousarray(idx,dtype="<u2")
+    pos_bytes=pos_arr.tobytes()
+    p_off=write_aligned(pos_bytes)
     bv_pos=len(bufferViews); bufferViews.append({"buffer":0,"byteOffset":p_off,"byteLength":len(pos_bytes),"target":34962})
-    xs=pos[0::3]; ys=pos[1::3]; zs=pos[2::3]
+    xyz=pos_arr.reshape(-1,3)
     acc_pos=len(accessors)
-    accessors.append({"bufferView":bv_pos,"componentType":5126,"count":len(pos)//3,"type":"VEC3","min":[min(xs),min(ys),min(zs)],"max":[max(xs),max(ys),max(zs)]})
-    idx_bytes=struct.pack("<%sH"%len(idx),*idx)
-    i_off=len(bin_data); bin_data.extend(idx_bytes); bin_data.extend(b"\x00"*align4(len(bin_data)))
+    accessors.append({"bufferView":bv_pos,"componentType":5126,"count":len(xyz),"type":"VEC3","min":xyz.min(axis=0).tolist(),"max":xyz.max(axis=0).tolist()})
+    idx_bytes=idx_arr.tobytes()
+    i_off=write_aligned(idx_bytes)
     bv_idx=len(bufferViews); bufferViews.append({"buffer":0,"byteOffset":i_off,"byteLength":len(idx_bytes),"target":34963})
-    acc_idx=len(accessors); accessors.append({"bufferView":bv_idx,"componentType":5123,"count":len(idx),"type":"SCALAR"})
+    acc_idx=len(accessors); accessors.append({"bufferView":bv_idx,"componentType":5123,"count":len(idx_arr),"type":"SCALAR"})
     meshes.append({"name":name,"primitives":[{"attributes":{"POSITION":acc_pos},"indices":acc_idx,"material":mat_index}]})
     nodes.append({"name":name,"mesh":len(meshes)-1})
 
@@ -222,6 +238,8 @@ for nm,pos,ind,mat in parts:
 root_index=len(nodes)
 nodes.append({"name":"SpaceGlider","children":list(range(root_index))})
 
+bin_len=bin_buf.tell()
+
 gltf={
     "asset":{"version":"2.0","generator":"space_glider_v4"},
     "scenes":[{"nodes":[root_index]}],
@@ -231,30 +249,31 @@ gltf={
     "materials":materials,
     "textures":textures,
     "images":images,
-    "buffers":[{"uri":"space_glider_v4.bin","byteLength":len(bin_data)}],
+    "buffers":[{"byteLength":bin_len}],
     "bufferViews":bufferViews,
     "accessors":accessors
 }
 
-with open(os.path.join(OUT_DIR,"space_glider_v4.bin"),"wb") as f: f.write(bin_data)
-with open(os.path.join(OUT_DIR,"space_glider_v4.gltf"),"w") as f: json.dump(gltf,f,indent=2)
-
+if WRITE_SIDECAR:
+    with open(os.path.join(OUT_DIR,"space_glider_v4.bin"),"wb") as f:
+        bin_buf.seek(0); shutil.copyfileobj(bin_buf,f)
+    # same manifest, but the buffer points at the external .bin
+    sidecar=dict(gltf,buffers=[{"uri":"space_glider_v4.bin","byteLength":bin_len}])
+    with open(os.path.join(OUT_DIR,"space_glider_v4.gltf"),"wb") as f: f.write(dumps_pretty(sidecar))
 
-# remove .bin uri for embedded buffer
-gltf["buffers"][0].pop("uri", None)
-json_str = json.dumps(gltf,separators=(',',':'))
 def pad4(b): return b + b' ' * ((4 - (len(b)%4)) % 4)
-json_bytes = pad4(json_str.encode("utf8"))
-bin_padded = pad4(bin_data)
-length = 12 + 8 + len(json_bytes) + 8 + len(bin_padded)
+json_bytes = pad4(dumps_compact(gltf))
+# every add_mesh write is already 4-byte aligned, so the BIN chunk needs no extra padding
+length = 12 + 8 + len(json_bytes) + 8 + bin_len
 
 out = os.path.join(OUT_DIR,"space_glider_v4.glb")
 with open(out,"wb") as f:
     f.write(struct.pack("<4sII",b'glTF',2,length))
     f.write(struct.pack("<I4s",len(json_bytes),b'JSON')); f.write(json_bytes)
-    f.write(struct.pack("<I4s",len(bin_padded),b'BIN\x00')); f.write(bin_padded)
+    f.write(struct.pack("<I4s",bin_len,b'BIN\x00'))
+    bin_buf.seek(0); shutil.copyfileobj(bin_buf,f)
 
 print("✅ Wrote", out)
 
 
-print("✅ Created space_glider_v4.gltf with visible thrusters and PBR textures in", OUT_DIR)
+if WRITE_SIDECAR: print("✅ Created space_glider_v4.gltf with visible thrusters and PBR textures in", OUT_DIR)
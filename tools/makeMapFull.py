@@ -1,12 +1,9 @@
-import geopandas as gpd
 import matplotlib.pyplot as plt
 import math
+from worldData import load_world_3857
 
-# Load world map
-world = gpd.read_file(gpd.datasets.get_path("naturalearth_lowres"))
-
-# Convert to standard Mercator
-world_merc = world.to_crs(epsg=3857)
+# Load world map in standard Mercator (cached after the first run)
+world_merc = load_world_3857()
 
 # Scale Mercator meters → same 100-unit range as your JSON (x ∈ [–50,+50])
 width = 100
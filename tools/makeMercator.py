@@ -1,10 +1,10 @@
-# requirements: geopandas, shapely, matplotlib, pillow
+# requirements: geopandas, shapely, matplotlib, pillow, numpy
 
 import os, json, math
-import geopandas as gpd
+import numpy as np
 import matplotlib.pyplot as plt
-from shapely.affinity import scale as shp_scale
 from PIL import Image
+from worldData import load_world_3857
 
 # ---------- inputs / filenames (relative) ----------
 CAPITALS_JSON = "capitals_mercator_with_iso.json"
@@ -32,13 +32,13 @@ CROP_Y_BOTTOM = -20.0
 CROP_SPAN     = CROP_Y_TOP - CROP_Y_BOTTOM   # 60
 
 # ---------- load world polygons and project ----------
-world = gpd.read_file(gpd.datasets.get_path("naturalearth_lowres")).to_crs(epsg=3857)
+world = load_world_3857()  # EPSG:3857, cached after the first run
 
 # rescale Web Mercator meters -> your 100-unit frame
 WEB_MERC_HALF = 20037508.342789244
 scale_factor  = WIDTH_UNITS / (2.0 * WEB_MERC_HALF)
-world["geometry"] = world["geometry"].apply(
-    lambda g: shp_scale(g, xfact=scale_factor, yfact=scale_factor, origin=(0, 0))
+world["geometry"] = world.geometry.affine_transform(
+    [scale_factor, 0, 0, scale_factor, 0, 0]
 )
 
 # ---------- render FULL map (plain, no axes, equal units, no margins) ----------
@@ -50,8 +50,9 @@ ax.set_axis_off()
 fig.subplots_adjust(0, 0, 1, 1)
 ax.set_aspect('equal', adjustable='box')        # <— enforce equal data units
 
-# plot countries and markers
+# plot countries once; the marker variant below reuses this collection
 world.plot(ax=ax, color="#a9afb4", edgecolor="#000000", linewidth=1., zorder=1)
+country_coll = ax.collections[-1]
 
 # exact full extents (same frame as your JSON)
 ax.set_xlim(X_MIN, X_MAX)
@@ -59,59 +60,26 @@ ax.set_ylim(Y_MIN, Y_MAX)
 
 # IMPORTANT: no bbox_inches='tight' so data->pixel mapping stays linear & full-frame
 fig.savefig(FULL_IMG_RAW, dpi=300, bbox_inches=None, pad_inches=0)
-plt.close(fig)
-
-# ---------- crop vertically EXACTLY to Y=+40..-20 ----------
-img = Image.open(FULL_IMG_RAW)
-W, H = img.size
-
-def y_to_px(y):   # top pixel row corresponds to Y_MAX
-    return int((Y_MAX - y) / (Y_MAX - Y_MIN) * H)
-
-top_px    = y_to_px(CROP_Y_TOP)
-bottom_px = y_to_px(CROP_Y_BOTTOM)
-if top_px > bottom_px:
-    top_px, bottom_px = bottom_px, top_px
 
-cropped = img.crop((0, top_px, W, bottom_px))
-cropped.save(CROPPED_IMG_RAW, "PNG")
-
-
-# --------- with markers ----------
-fig_w = 10.0                                    # base height below will set the final width
-# For the FULL frame, aspect ≈ 100 : (2*49.836...) ~ 1.003 — nearly square
-fig_h = 10.0
-fig, ax = plt.subplots(figsize=(fig_w, fig_h))
-ax.set_axis_off()
-fig.subplots_adjust(0, 0, 1, 1)
-ax.set_aspect('equal', adjustable='box')        # <— enforce equal data units
-
-# plot countries and markers
-world.plot(ax=ax, color="#a9afb4", edgecolor="#000000", linewidth=0.5, zorder=1)
+# --------- with markers (same figure, thinner borders + overlay layers) ----------
+country_coll.set_linewidth(0.5)
 
 # capitals. only for test
-for iso, c in capitals.items():
-    ax.scatter(c["x"], c["y"], s=36, color="#ff9f1a", edgecolors="#0000c0", linewidths=1.0, zorder=5)
+cap_xy = np.array([[c["x"], c["y"]] for c in capitals.values()]).reshape(-1, 2)
+ax.scatter(cap_xy[:, 0], cap_xy[:, 1], s=36, color="#ff9f1a", edgecolors="#0000c0", linewidths=1.0, zorder=5)
 
 # load country centers (from makeMercator.py)
 with open(CENTERS, "r", encoding="utf-8") as f:
     centers = json.load(f)
 
-for item in centers:
-    ax.scatter(item["center_mercator"][0], item["center_mercator"][1], s=50, color="#ffff1a", edgecolors="#0000c0", linewidths=1.0, zorder=10)
-
-
-# exact full extents (same frame as your JSON)
-ax.set_xlim(X_MIN, X_MAX)
-ax.set_ylim(Y_MIN, Y_MAX)
+center_xy = np.array([item["center_mercator"] for item in centers]).reshape(-1, 2)
+ax.scatter(center_xy[:, 0], center_xy[:, 1], s=50, color="#ffff1a", edgecolors="#0000c0", linewidths=1.0, zorder=10)
 
-# IMPORTANT: no bbox_inches='tight' so data->pixel mapping stays linear & full-frame
 fig.savefig(FULL_IMG, dpi=300, bbox_inches=None, pad_inches=0)
 plt.close(fig)
 
-
-# ---------- crop vertically EXACTLY to Y=+40..-20 ----------
-img = Image.open(FULL_IMG)
+# ---------- crop both renders vertically EXACTLY to Y=+40..-20 ----------
+img = Image.open(FULL_IMG_RAW)
 W, H = img.size
 
 def y_to_px(y):   # top pixel row corresponds to Y_MAX
@@ -122,39 +90,47 @@ bottom_px = y_to_px(CROP_Y_BOTTOM)
 if top_px > bottom_px:
     top_px, bottom_px = bottom_px, top_px
 
-cropped = img.crop((0, top_px, W, bottom_px))
-cropped.save(CROPPED_IMG, "PNG")
-
-
+img.crop((0, top_px, W, bottom_px)).save(CROPPED_IMG_RAW, "PNG")
+Image.open(FULL_IMG).crop((0, top_px, W, bottom_px)).save(CROPPED_IMG, "PNG")
 
 
 # ---------- pixel coordinates for capitals on the CROPPED image ----------
 Hc = bottom_px - top_px
 
-def x_to_px(x):
-    return (x - X_MIN) / (X_MAX - X_MIN) * W
-
+def to_px(xy):
+    """Data (N,2) -> (x_px, y_px, in_crop) on the cropped image, all points at once."""
+    xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+    x_px = np.round((xy[:, 0] - X_MIN) / (X_MAX - X_MIN) * W, 2)
+    # whole pixel rows like y_to_px, shifted into cropped image coords
+    y_px = ((Y_MAX - xy[:, 1]) / (Y_MAX - Y_MIN) * H).astype(int) - top_px
+    in_crop = (xy[:, 1] >= CROP_Y_BOTTOM) & (xy[:, 1] <= CROP_Y_TOP)
+    return x_px.tolist(), y_px.tolist(), in_crop.tolist()
+
+cap_keys = list(capitals)
+x_px, y_px, in_crop = to_px([[capitals[k]["x"], capitals[k]["y"]] for k in cap_keys])
 cap_pixels = {}
-for iso, c in capitals.items():
-    x, y = c["x"], c["y"]
-    if not (CROP_Y_BOTTOM <= y <= CROP_Y_TOP):
+for i, iso in enumerate(cap_keys):
+    if not in_crop[i]:
         continue
+    c = capitals[iso]
     cap_pixels[iso] = {
         "country": c["country"],
         "capital": c["capital"],
-        "x_data": x,                 # unchanged (you’re right)
-        "y_data": y,
-        "x_px": round(x_to_px(x), 2),
-        "y_px": round(y_to_px(y) - top_px, 2)  # shift into cropped image coords
+        "x_data": c["x"],            # unchanged (you’re right)
+        "y_data": c["y"],
+        "x_px": x_px[i],
+        "y_px": y_px[i]
     }
 
-for item in centers:
-    x, y = item["center_mercator"]
-    if not (CROP_Y_BOTTOM <= y <= CROP_Y_TOP):
+x_px, y_px, in_crop = to_px([item["center_mercator"] for item in centers])
+y_shift = (CROP_Y_TOP + CROP_Y_BOTTOM) / 2.0
+for i, item in enumerate(centers):
+    if not in_crop[i]:
         continue
-    item["crop_x_px"] = round(x_to_px(x), 2)
-    item["crop_y_px"] = round(y_to_px(y) - top_px, 2)
-    item["center_mercator_cropped"] = [x, y - ((CROP_Y_TOP + CROP_Y_BOTTOM) / 2.0)]
+    x, y = item["center_mercator"]
+    item["crop_x_px"] = x_px[i]
+    item["crop_y_px"] = y_px[i]
+    item["center_mercator_cropped"] = [x, y - y_shift]
 with open(CENTERS_CROP, "w", encoding="utf-8") as f:
     json.dump(centers, f, ensure_ascii=False, indent=2) 
 
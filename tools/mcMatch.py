@@ -1,5 +1,5 @@
+import numpy as np
 import pandas as pd
-import random
 
 m = pd.read_json("movies_rich.json")
 c = pd.read_json("countries_with_center_mercator_cropped.json")
@@ -7,12 +7,10 @@ c = pd.read_json("countries_with_center_mercator_cropped.json")
 print(m.info())
 print(c.info())
 
-# split comma-separated ids into lists, strip whitespace and remove empty strings
-c["movie_id"] = c["ids"].fillna("").astype(str).str.split(",").apply(lambda lst: [s.strip() for s in lst if s.strip()])
-
-# explode so there's one row per id and convert to nullable integer, dropping invalid entries
+# split comma-separated ids, one row per id; blanks and invalid entries become NA and are dropped
+c["movie_id"] = c["ids"].fillna("").astype(str).str.split(",")
 c = c.explode("movie_id").reset_index(drop=True)
-c["movie_id"] = pd.to_numeric(c["movie_id"], errors="coerce").astype(pd.Int64Dtype())
+c["movie_id"] = pd.to_numeric(c["movie_id"].str.strip(), errors="coerce").astype(pd.Int64Dtype())
 c = c[c["movie_id"].notna()].reset_index(drop=True)
 
 print(c.info())
@@ -29,14 +27,13 @@ mc.to_json("mcMatched.json", orient="records", indent=2)
 # x: from center_mercator"[0]
 # y: from center_mercator"[1]
 # w: from 1 / group size
-attractors = mc.groupby("movie_id").agg(list).reset_index()
-attractors["attractors"] = attractors["center_mercator_cropped"].apply(lambda lst: [
+# only the coordinate column is grouped, then mapped onto the first row per movie
+attractors = c.groupby("movie_id", sort=False)["center_mercator_cropped"].agg(list).apply(lambda lst: [
     {"x": item[0], "z": item[1], "w": 1 / len(lst)} for item in lst
-])  
-# add the attractors list to the dataframe
-mc = mc.merge(attractors[["movie_id", "attractors"]], on="movie_id", how="left")
+])
 # select first row per movie_id to avoid duplicates
 mc = mc.drop_duplicates(subset=["movie_id"]).reset_index(drop=True)
+mc["attractors"] = mc["movie_id"].map(attractors)
 
 # add the following columns to mc:
 # i=i, a=prop_a[i], b=prop_b[i], c=clusters[i], d=diam[i]
@@ -44,15 +41,14 @@ mc = mc.drop_duplicates(subset=["movie_id"]).reset_index(drop=True)
 # print(mc.columns)
 
 mc["i"] = mc.index
-mc["a"] = [random.uniform(-.1,.1) for _ in range(len(mc))]  # a: random float between -0.1 and 0.1
+rng = np.random.default_rng()
+mc["a"] = rng.uniform(-0.1, 0.1, len(mc))  # a: random float between -0.1 and 0.1
 
 # b from age
-mc["b"] = [
-    (pd.to_numeric(y, errors="coerce") - 1990) + random.uniform(-0.1, 0.1)
-    for y in mc["JAHR"]
-]
+mc["b"] = (pd.to_numeric(mc["JAHR"], errors="coerce") - 1990) + rng.uniform(-0.1, 0.1, len(mc))
 mc["d"] = 1  # d: constant value of 1
 # c: cluster assignment, 2 objects in c=1, 3 objects in c=2
 mc["c"] = mc["movie_id"]   # cluster assignment based on movie_id
 
-mc.to_json("mcMatch_full.json", orient="records", indent=2)
+# compact records: force*.py only re-read this, so skip the indent whitespace
+mc.to_json("mcMatch_full.json", orient="records")
@@ -1,26 +1,29 @@
 import requests, math, json
+import numpy as np
 
 def mercator_projection(lat, lon, width=100):
     """
     Convert lat/lon (degrees) to Mercator x/y with extent in x = width units.
-    0,0 = Equator/Greenwich.
+    0,0 = Equator/Greenwich. Accepts scalars or arrays.
     """
+    lon = np.asarray(lon, dtype=float)
+    lat = np.clip(np.asarray(lat, dtype=float), -85.0, 85.0)  # clamp to avoid infinity
     x = lon / 360.0 * width
-    lat = max(-85.0, min(85.0, lat))  # clamp to avoid infinity
-    lat_rad = math.radians(lat)
-    y = math.log(math.tan(math.pi / 4 + lat_rad / 2)) * (width / (2 * math.pi))
+    y = np.log(np.tan(np.pi / 4 + np.radians(lat) / 2)) * (width / (2 * np.pi))
     return x, y
 
-def get_capital_coords(country_input):
+def get_capital_coords(country_inputs):
     """
-    Query Wikidata for a country's capital, ISO code, and coordinates.
-    Input can be country name or code.
+    Query Wikidata for the capital, ISO code, and coordinates of every country
+    in one request. Inputs are country names or codes; unmatched ones are dropped.
     """
+    values = " ".join(f'"{c}"@en' for c in country_inputs)
     query = f"""
-    SELECT ?country ?countryLabel ?countryCode ?capitalLabel ?coord
+    SELECT ?name ?country ?countryLabel ?countryCode ?capitalLabel ?coord
     WHERE {{
+      VALUES ?name {{ {values} }}
       ?country wdt:P31 wd:Q6256;
-               (rdfs:label|skos:altLabel) "{country_input}"@en;
+               (rdfs:label|skos:altLabel) ?name;
                wdt:P297 ?countryCode;
                wdt:P36 ?capital.
       ?capital wdt:P625 ?coord.
@@ -34,34 +37,35 @@ def get_capital_coords(country_input):
     r.raise_for_status()
     data = r.json()
 
-    if not data["results"]["bindings"]:
-        return None
+    # first binding per input name, kept in input order
+    first = {}
+    for b in data["results"]["bindings"]:
+        first.setdefault(b["name"]["value"], b)
+    rows = [first[c] for c in country_inputs if c in first]
+    if not rows:
+        return []
 
-    result = data["results"]["bindings"][0]
-    coord = result["coord"]["value"].replace("Point(", "").replace(")", "")
-    lon, lat = map(float, coord.split())
+    lonlat = np.array([b["coord"]["value"].replace("Point(", "").replace(")", "").split()
+                       for b in rows], dtype=float)
+    lon, lat = lonlat[:, 0], lonlat[:, 1]
     x, y = mercator_projection(lat, lon)
 
-    return {
-        "country": result["countryLabel"]["value"],
-        "iso2": result["countryCode"]["value"],
-        "capital": result["capitalLabel"]["value"],
-        "lat": lat,
-        "lon": lon,
-        "x": round(x, 6),
-        "y": round(y, 6)
-    }
+    return [{
+        "country": b["countryLabel"]["value"],
+        "iso2": b["countryCode"]["value"],
+        "capital": b["capitalLabel"]["value"],
+        "lat": float(lat[i]),
+        "lon": float(lon[i]),
+        "x": round(float(x[i]), 6),
+        "y": round(float(y[i]), 6)
+    } for i, b in enumerate(rows)]
 
 # Example list of countries
 countries = ["United States", "Argentina", "Australia", "India", "Japan",
              "China", "Russia", "Germany", "Israel", "South Africa","Canada","Morocco"]
 
-results = {}
-for c in countries:
-    print(f"Fetching {c}...")
-    info = get_capital_coords(c)
-    if info:
-        results[info["iso2"]] = info
+print(f"Fetching {len(countries)} countries...")
+results = {info["iso2"]: info for info in get_capital_coords(countries)}
 
 # Compute Mercator extents for reference
 width = 100
@@ -41,8 +41,6 @@ except:
 
         # Load the .shp file
         gdf = gpd.read_file(f'{base}.shp')
-        # Load the .shx file (if it exists)
-        gdf = gdf.sjoin(gpd.read_file(f'{base}.shx'), how='inner')
         # Print the geometry information
         print("Geometry Information:")
         print(gdf.geometry)
@@ -52,15 +50,14 @@ except:
         print("Geometry Information wgs84:")
         print(gdf.geometry)
 
-        world = gdf[["geometry","ADMIN_left"]]
-        world = world.rename(columns={"ADMIN_left":"name"})
+        world = gdf[["geometry","ADMIN"]]
+        world = world.rename(columns={"ADMIN":"name"})
         postfix = "web"        
 
     except:
         print("naturalearth zip didn't work either")
         raise
 
-centers = world.centroid
 # compute centroids (ensure using geometry column) and add lon/lat columns
 centroids = world.geometry.centroid
 world["center_lon"] = centroids.x
@@ -87,11 +84,7 @@ with open(output_path, "w") as f:
 # keep only the largest feature for each name by sorting and dropping duplicates
 world = world.sort_values('size', ascending=False).drop_duplicates(subset='name', keep='first').reset_index(drop=True)
 
-# recompute centers (indexes changed) and update lon/lat
-centroids = world.geometry.centroid
-world["center_lon"] = centroids.x
-world["center_lat"] = centroids.y
-
+# center_lon/center_lat travel with their rows, so no centroid recompute is needed
 print("deduplicated world count:", len(world))
 
 # save deduplicated GeoJSON (use 'deduped' to avoid lint/spell warnings)
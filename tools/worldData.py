@@ -0,0 +1,39 @@
+# requirements: geopandas (pyarrow optional, enables the cache)
+
+import glob
+import os
+import geopandas as gpd
+
+# next to this file, not the caller's working directory (ignored by git)
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+
+
+def load_world_3857(source="naturalearth_lowres"):
+    """
+    naturalearth_lowres projected to Web Mercator (EPSG:3857), in meters.
+    The projected frame is cached as feather keyed on (source, epsg) and the
+    source file's size and mtime, so only the first run pays for the pyproj
+    reprojection and a changed source is reprojected instead of served
+    stale. Without pyarrow the frame is just loaded and projected every time.
+    """
+    src = gpd.datasets.get_path(source)
+    st = os.stat(src)
+    stem = f"world_{source}_3857"
+    path = os.path.join(CACHE_DIR, f"{stem}_{st.st_size}_{st.st_mtime_ns}.feather")
+    try:
+        if os.path.exists(path):
+            return gpd.read_feather(path)
+    except ImportError:
+        pass
+
+    world = gpd.read_file(src).to_crs(epsg=3857)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        world.to_feather(path)
+    except ImportError:
+        return world
+    # drop projections of earlier versions of the source
+    for old in glob.glob(os.path.join(CACHE_DIR, f"{stem}_*.feather")):
+        if old != path:
+            os.remove(old)
+    return world